@@ -0,0 +1,392 @@
+"""Benchmarks del scraper sobre un corpus de páginas guardadas.
+
+Uso (desde web-scraper-code/):
+
+    python benchmarks/run.py                    # ejecuta y compara con baseline.json
+    python benchmarks/run.py --save-baseline    # guarda los resultados como nueva baseline
+    python benchmarks/run.py --profile out/     # cProfile por benchmark (.prof + resumen)
+    python benchmarks/run.py --flamegraph out/  # flamegraph SVG con py-spy
+"""
+import argparse
+import cProfile
+import json
+import logging
+import os
+import platform
+import pstats
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import timeit
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, PROJECT_DIR)
+
+from benchmarks.server import CORPUS_DIR, serve_corpus  # noqa: E402
+
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+CORPUS = {
+    'shopify': ('shopify_collection.html', 'https://tienda-demo.com/collections/hombre-camisetas'),
+    'magento': ('magento_category.html', 'https://magento-demo.com/mujer-pantalones.html'),
+    'custom': ('custom_grid.html', 'https://grid-demo.com/c/sudaderas'),
+}
+
+STORAGE_SIZES = (1000, 10000, 50000)
+
+IMPORT_TARGETS = ('main', 'scraper.parser', 'scraper.distributed', 'scraper.storage')
+
+# Módulos que no deben cargarse al importar la pila de parseo
+PARSING_STACK = 'scraper.parser'
+HEAVY_MODULES = ('playwright', 'pandas', 'requests', 'bs4', 'http.server')
+
+
+def load_page(name):
+    filename, _ = CORPUS[name]
+    with open(os.path.join(CORPUS_DIR, filename), encoding='utf-8') as f:
+        return f.read()
+
+
+def make_products(count, offset=0):
+    from scraper.models import Product
+
+    return [
+        Product(
+            marca='BENCH',
+            genero='Hombre',
+            categoria='Camisetas',
+            nombre=f'Producto {i}',
+            precio=10 + (i % 90),
+            url=f'https://bench.example/products/{i}',
+            imagen=f'https://bench.example/img/{i}.jpg',
+        )
+        for i in range(offset, offset + count)
+    ]
+
+
+def parser_benchmarks():
+    from scraper.parser import UniversalParser
+    from scraper.profiles import ProfileStore
+    from scraper.structured import extract_products
+
+    cases = {}
+    for name, (_, base_url) in CORPUS.items():
+        html = load_page(name)
+
+        def parse(html=html, base_url=base_url):
+            UniversalParser(base_url, profile_store=ProfileStore(None)).parse_products(html)
+
+        learned_store = ProfileStore(None)
+        UniversalParser(base_url, profile_store=learned_store).parse_products(html)
+
+        def parse_learned(html=html, base_url=base_url, store=learned_store):
+            UniversalParser(base_url, profile_store=store).parse_products(html)
+
+        parser = UniversalParser(base_url, profile_store=ProfileStore(None))
+        parser.parse_html(html)
+
+        cases[f'parse_products[{name}]'] = parse
+        cases[f'parse_products_learned[{name}]'] = parse_learned
+        cases[f'extract_structured[{name}]'] = (
+            lambda html=html, base_url=base_url: extract_products(html, base_url)
+        )
+        cases[f'find_by_price[{name}]'] = parser._find_by_price
+        cases[f'auto_detect_categories[{name}]'] = parser._auto_detect_categories
+    return cases
+
+
+def storage_benchmarks(workdir):
+    from scraper.models import to_frame
+    from scraper.storage import Storage
+
+    cases = {}
+    batch = make_products(100, offset=10 ** 7)
+    for size in STORAGE_SIZES:
+        directory = os.path.join(workdir, f'storage_{size}')
+        os.makedirs(directory)
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            storage = Storage()
+        finally:
+            os.chdir(cwd)
+        storage.data_dir = os.path.join(directory, 'data')
+        storage.raw_dir = os.path.join(storage.data_dir, 'raw')
+        storage.processed_dir = os.path.join(storage.data_dir, 'processed')
+        to_frame(make_products(size)).to_csv(
+            os.path.join(storage.data_dir, 'products.csv'), index=False, encoding='utf-8-sig'
+        )
+
+        def save(storage=storage):
+            storage.save_processed(batch)
+
+        cases[f'save_processed[{size}]'] = save
+    return cases
+
+
+# Etapas de get_page que miden trabajo real; readiness y scroll son esperas fijas
+FETCH_STAGES = ('navigation', 'parse')
+
+
+def fetch_names(pages=CORPUS):
+    return [f'fetch[{page}:{stage}]' for page in pages for stage in FETCH_STAGES]
+
+
+def _stage_result(histogram):
+    return {
+        'repeat': histogram['count'],
+        'min': histogram['min'],
+        'mean': histogram['mean'],
+        'max': histogram['max'],
+        'buckets': histogram['buckets'],
+    }
+
+
+def fetch_benchmarks(base_url, repeat, name_filter=None):
+    """Carga cada página del corpus `repeat` veces con Playwright y devuelve los
+    histogramas de navegación y parseo de scraper.metrics, sin random_delay."""
+    try:
+        import scraper.fetcher as fetcher_module
+    except ImportError as e:
+        print(f'  fetch omitido: {e}')
+        return {}
+    from unittest import mock
+    from scraper.metrics import get_metrics
+    from scraper.parser import UniversalParser
+    from scraper.profiles import ProfileStore
+
+    pages = [
+        page for page in CORPUS
+        if not name_filter or any(name_filter in name for name in fetch_names([page]))
+    ]
+    if not pages:
+        return {}
+
+    metrics = get_metrics()
+    fetcher = fetcher_module.PlaywrightFetcher()
+    results = {}
+    try:
+        with mock.patch.object(fetcher_module, 'random_delay', lambda: None):
+            # Calentamiento: arranque del navegador fuera de la medida
+            fetcher.get_page(f'{base_url}/{CORPUS[pages[0]][0]}')
+
+            for page in pages:
+                url = f'{base_url}/{CORPUS[page][0]}'
+                metrics.reset()
+                for _ in range(repeat):
+                    html = fetcher.get_page(url)
+                    UniversalParser(url, profile_store=ProfileStore(None)).parse_products(html)
+
+                for histogram in metrics.to_dict()['histograms']:
+                    stage = histogram['labels'].get('stage')
+                    if histogram['name'] == 'scraper_parse_seconds':
+                        stage = 'parse'
+                    elif histogram['name'] != 'scraper_fetch_seconds':
+                        continue
+                    if stage in FETCH_STAGES:
+                        results[f'fetch[{page}:{stage}]'] = _stage_result(histogram)
+    finally:
+        fetcher.close()
+    return results
+
+
+def measure_import(module, repeat):
+    """Tiempo acumulado de `import module` según python -X importtime, en un proceso limpio"""
+    times = []
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            cwd=PROJECT_DIR, capture_output=True, text=True
+        )
+        cumulative = None
+        for line in completed.stderr.splitlines():
+            parts = line.split('|')
+            if len(parts) == 3 and parts[2].strip() == module:
+                cumulative = int(parts[1].strip())
+        if completed.returncode != 0 or cumulative is None:
+            raise RuntimeError(f'No se pudo importar {module}: {completed.stderr[-300:]}')
+        times.append(cumulative / 1e6)
+
+    return {
+        'repeat': repeat,
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.mean(times),
+    }
+
+
+def heavy_imports(module=PARSING_STACK):
+    code = (
+        f'import sys, {module}; '
+        f'print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))'
+    )
+    completed = subprocess.run(
+        [sys.executable, '-c', code], cwd=PROJECT_DIR, capture_output=True, text=True
+    )
+    return [m for m in completed.stdout.strip().split(',') if m]
+
+
+def measure(func, repeat):
+    func()
+    times = timeit.Timer(func).repeat(repeat=repeat, number=1)
+    return {
+        'repeat': repeat,
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.mean(times),
+    }
+
+
+def profile(name, func, output_dir):
+    safe = name.replace('[', '_').replace(']', '')
+    prof_path = os.path.join(output_dir, f'{safe}.prof')
+    profiler = cProfile.Profile()
+    profiler.runcall(func)
+    profiler.dump_stats(prof_path)
+
+    with open(os.path.join(output_dir, f'{safe}.txt'), 'w', encoding='utf-8') as f:
+        pstats.Stats(prof_path, stream=f).sort_stats('cumulative').print_stats(30)
+
+
+def _center(result):
+    # Los benchmarks con timeit guardan la mediana; las etapas de fetch, la media del histograma
+    return result['median'] if 'median' in result else result['mean']
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, result in sorted(results.items()):
+        previous = baseline.get('results', {}).get(name)
+        if not previous:
+            print(f'  {name:40s} {_center(result) * 1000:10.2f} ms  (nuevo)')
+            continue
+        ratio = _center(result) / _center(previous) if _center(previous) else 1.0
+        flag = ''
+        if ratio > 1 + tolerance:
+            flag = '  REGRESIÓN'
+            regressions.append(name)
+        print(f'  {name:40s} {_center(result) * 1000:10.2f} ms  x{ratio:.2f}{flag}')
+    return regressions
+
+
+def run_flamegraph(args):
+    py_spy = shutil.which('py-spy')
+    if not py_spy:
+        print('py-spy no está instalado (pip install py-spy)')
+        return 1
+
+    os.makedirs(args.flamegraph, exist_ok=True)
+    output = os.path.join(args.flamegraph, 'flamegraph.svg')
+    command = [py_spy, 'record', '-o', output, '--', sys.executable, os.path.abspath(__file__),
+               '--repeat', str(args.repeat), '--no-compare']
+    if args.filter:
+        command += ['--filter', args.filter]
+    if args.skip_fetch:
+        command.append('--skip-fetch')
+    code = subprocess.call(command)
+    print(f'Flamegraph: {output}')
+    return code
+
+
+def parse_args(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Benchmarks del scraper')
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    arg_parser.add_argument('--fetch-repeat', type=int, default=3,
+                            help='Cargas por página en los benchmarks de fetch')
+    arg_parser.add_argument('--filter', help='Ejecuta sólo los benchmarks que contengan este texto')
+    arg_parser.add_argument('--skip-fetch', action='store_true',
+                            help='Omite la carga con Playwright contra el servidor local')
+    arg_parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Margen sobre la baseline antes de marcar regresión')
+    arg_parser.add_argument('--save-baseline', action='store_true')
+    arg_parser.add_argument('--no-compare', action='store_true')
+    arg_parser.add_argument('--output', help='Fichero JSON de resultados')
+    arg_parser.add_argument('--profile', metavar='DIR', help='Guarda un perfil cProfile por benchmark')
+    arg_parser.add_argument('--flamegraph', metavar='DIR', help='Genera un flamegraph con py-spy')
+    return arg_parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.flamegraph:
+        return run_flamegraph(args)
+
+    logging.basicConfig(level=logging.WARNING)
+    workdir = tempfile.mkdtemp(prefix='scraper-bench-')
+    server, base_url = serve_corpus()
+
+    try:
+        cases = {}
+        cases.update(parser_benchmarks())
+        cases.update(storage_benchmarks(workdir))
+
+        if args.filter:
+            cases = {name: func for name, func in cases.items() if args.filter in name}
+
+        if args.profile:
+            os.makedirs(args.profile, exist_ok=True)
+
+        results = {}
+        for module in IMPORT_TARGETS:
+            name = f'import[{module}]'
+            if args.filter and args.filter not in name:
+                continue
+            try:
+                results[name] = measure_import(module, args.repeat)
+            except RuntimeError as e:
+                print(f'  {name} omitido: {e}')
+
+        for name, func in cases.items():
+            results[name] = measure(func, args.repeat)
+            if args.profile:
+                profile(name, func, args.profile)
+
+        if not args.skip_fetch:
+            results.update(fetch_benchmarks(base_url, args.fetch_repeat, args.filter))
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f'bench_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f'Resultados: {output}')
+
+    regressions = []
+    loaded = heavy_imports()
+    if loaded:
+        print(f'  {PARSING_STACK} carga dependencias pesadas: {", ".join(loaded)}')
+        regressions.append(f'import[{PARSING_STACK}]')
+
+    if not args.no_compare and os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding='utf-8') as f:
+            regressions += compare(results, json.load(f), args.tolerance)
+    else:
+        for name, result in sorted(results.items()):
+            print(f'  {name:40s} {_center(result) * 1000:10.2f} ms')
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f'Baseline actualizada: {BASELINE_PATH}')
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
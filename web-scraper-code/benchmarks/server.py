@@ -0,0 +1,30 @@
+import os
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_corpus(directory=CORPUS_DIR, host='127.0.0.1', port=0):
+    """Sirve las páginas guardadas en un hilo. Devuelve (server, base_url)."""
+    handler = partial(_QuietHandler, directory=directory)
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f'http://{host}:{server.server_address[1]}'
+
+
+if __name__ == '__main__':
+    server, base_url = serve_corpus(port=8765)
+    print(f'Sirviendo {CORPUS_DIR} en {base_url} (Ctrl+C para salir)')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
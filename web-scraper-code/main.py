@@ -1,9 +1,12 @@
 import sys
+import argparse
 import logging
 from datetime import datetime
-from scraper.fetcher import get_page, close_fetcher
-from scraper.parser import UniversalParser
-from scraper.storage import save_csv
+from scraper.metrics import get_metrics, start_metrics_server
+from scraper.config import (
+    METRICS_PORT, METRICS_HOST, QUEUE_BACKEND, QUEUE_URL,
+    IMAGE_CONCURRENCY, IMAGE_BANDWIDTH, QUERY_PORT
+)
 
 
 def setup_logging():
@@ -72,6 +75,13 @@ def extract_category_from_url(url):
 
 
 def run_scraper():
+    # Playwright, bs4, requests y pandas sólo se cargan al scrapear, no para --help
+    from scraper.fetcher import get_fetcher, close_fetcher
+    from scraper.api_harvest import scrape_products
+    from scraper.utils.session import close_session
+    from scraper.parser import UniversalParser
+    from scraper.storage import save_csv
+
     log_file = setup_logging()
     print_banner()
 
@@ -87,23 +97,15 @@ def run_scraper():
         genero, categoria = extract_category_from_url(url)
         print(f"Clasificación detectada: {genero} -> {categoria}\n")
 
-        print("Cargando página.")
-        html = get_page(url)
-
-        if not html:
-            print("No se pudo cargar la página")
-            return
-
-        print("Buscando productos...")
-        products = parser.parse_products(html)
+        print("Cargando página y buscando productos...")
+        products = scrape_products(url, parser, get_fetcher())
 
         if not products:
             print("No se encontraron productos en esta página")
             return
 
         for product in products:
-            product['genero'] = genero
-            product['categoria'] = categoria
+            product.classify(genero, categoria)
 
         all_products.extend(products)
         print(f"{len(products)} productos encontrados")
@@ -116,13 +118,11 @@ def run_scraper():
                 url = 'https://' + url
 
             genero, categoria = extract_category_from_url(url)
-            html = get_page(url)
+            products = scrape_products(url, parser, get_fetcher())
 
-            if html:
-                products = parser.parse_products(html)
+            if products:
                 for product in products:
-                    product['genero'] = genero
-                    product['categoria'] = categoria
+                    product.classify(genero, categoria)
                 all_products.extend(products)
                 print(f"{len(products)} productos encontrados (Total: {len(all_products)})")
 
@@ -144,12 +144,12 @@ def run_scraper():
 
         from collections import Counter
 
-        categorias_count = Counter(p.get('categoria', 'Sin categoría') for p in all_products)
+        categorias_count = Counter(p.categoria or 'Sin categoría' for p in all_products)
         print("\nPor categoría:")
         for cat, count in categorias_count.most_common():
             print(f"  {cat}: {count}")
 
-        generos_count = Counter(p.get('genero', 'Sin clasificar') for p in all_products)
+        generos_count = Counter(p.genero or 'Sin clasificar' for p in all_products)
         print("\nPor género:")
         for gen, count in generos_count.most_common():
             print(f"  {gen}: {count}")
@@ -162,8 +162,165 @@ def run_scraper():
     finally:
         print("\nCerrando fetcher.")
         close_fetcher()
+        close_session()
+        get_metrics().write_report(log_file)
         print("Proceso finalizado\n")
 
 
+def read_manifest(path):
+    with open(path, encoding='utf-8') as f:
+        urls = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+    tasks = []
+    for url in urls:
+        if not url.startswith('http'):
+            url = 'https://' + url
+        genero, categoria = extract_category_from_url(url)
+        tasks.append({'url': url, 'genero': genero, 'categoria': categoria})
+    return tasks
+
+
+def run_coordinator_mode(args):
+    from scraper.distributed import discover_tasks, run_coordinator
+    from scraper.work_queue import get_queue
+
+    log_file = setup_logging()
+    queue = get_queue(args.backend, args.queue_url)
+
+    try:
+        tasks = []
+        if args.manifest:
+            tasks.extend(read_manifest(args.manifest))
+        if args.discover:
+            tasks.extend(discover_tasks(args.discover))
+
+        added = queue.put_many(tasks)
+        print(f"{added} URLs encoladas ({queue.pending()} pendientes)")
+
+        if not args.no_wait:
+            total = run_coordinator(queue, poll_interval=args.poll_interval)
+            print(f"Total productos recibidos: {total}")
+        print(f"Log: {log_file}")
+    finally:
+        queue.close()
+        get_metrics().write_report(log_file)
+
+
+def run_worker_mode(args):
+    from scraper.distributed import run_worker
+
+    log_file = setup_logging()
+    try:
+        processed = run_worker(
+            pool_size=args.pool_size,
+            backend=args.backend,
+            url=args.queue_url,
+            idle_timeout=args.idle_timeout
+        )
+        print(f"Tareas procesadas: {processed}")
+        print(f"Log: {log_file}")
+    finally:
+        get_metrics().write_report(log_file)
+
+
+def run_images_mode(args):
+    from scraper.images import ImagePipeline
+    from scraper.storage import Storage
+
+    log_file = setup_logging()
+    storage = Storage()
+    df = storage.load_products()
+    if df.empty or 'imagen' not in df.columns:
+        print("No hay productos con imagen. Ejecuta primero el scraper.")
+        return
+
+    pipeline = ImagePipeline(concurrency=args.concurrency, bandwidth=args.bandwidth)
+    try:
+        metadata = pipeline.run(df['imagen'].dropna().tolist())
+        storage.attach_image_metadata(metadata)
+        miniaturas = len({m['miniatura'] for m in metadata})
+        print(f"Imágenes procesadas: {len(metadata)} ({miniaturas} miniaturas únicas)")
+        print(f"Log: {log_file}")
+    finally:
+        pipeline.close()
+        get_metrics().write_report(log_file)
+
+
+def run_serve_mode(args):
+    from scraper.query import serve
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] %(message)s')
+    server = serve(args.port, args.host)
+    print(f"API de productos en http://{args.host}:{args.port} (Ctrl+C para salir)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def parse_args(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Scraper universal de productos')
+    arg_parser.add_argument('--metrics-port', type=int, default=METRICS_PORT,
+                            help='Puerto para servir /metrics (0 = desactivado)')
+    arg_parser.add_argument('--metrics-host', default=METRICS_HOST,
+                            help='Interfaz de /metrics (0.0.0.0 para exponerlo en la red)')
+    subparsers = arg_parser.add_subparsers(dest='mode')
+
+    coordinator = subparsers.add_parser(
+        'coordinator', help='Encola URLs y guarda los resultados de los workers'
+    )
+    coordinator.add_argument('--manifest', help='Fichero con una URL por línea')
+    coordinator.add_argument('--discover', help='URL de la que detectar categorías')
+    coordinator.add_argument('--no-wait', action='store_true',
+                             help='Sólo encolar, sin esperar resultados')
+    coordinator.add_argument('--poll-interval', type=float, default=5)
+
+    worker = subparsers.add_parser('worker', help='Consume URLs de la cola compartida')
+    worker.add_argument('--pool-size', type=int, default=1,
+                        help='Navegadores en paralelo en este proceso')
+    worker.add_argument('--idle-timeout', type=float, default=None,
+                        help='Segundos sin tareas antes de terminar')
+
+    images = subparsers.add_parser(
+        'images', help='Descarga y deduplica las imágenes de data/products.csv'
+    )
+    images.add_argument('--concurrency', type=int, default=IMAGE_CONCURRENCY,
+                        help='Descargas simultáneas')
+    images.add_argument('--bandwidth', type=int, default=IMAGE_BANDWIDTH,
+                        help='Bytes/s máximos por dominio (0 = sin límite)')
+
+    serve = subparsers.add_parser(
+        'serve', help='API HTTP de consulta y exportación sobre data/products.csv'
+    )
+    serve.add_argument('--port', type=int, default=QUERY_PORT)
+    serve.add_argument('--host', default='127.0.0.1')
+
+    for sub in (coordinator, worker):
+        sub.add_argument('--backend', default=QUEUE_BACKEND, choices=['sqlite', 'redis'])
+        sub.add_argument('--queue-url', default=QUEUE_URL,
+                         help='Ruta del fichero SQLite o URL de Redis')
+
+    return arg_parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.metrics_port:
+        start_metrics_server(args.metrics_port, args.metrics_host)
+
+    if args.mode == 'coordinator':
+        run_coordinator_mode(args)
+    elif args.mode == 'worker':
+        run_worker_mode(args)
+    elif args.mode == 'images':
+        run_images_mode(args)
+    elif args.mode == 'serve':
+        run_serve_mode(args)
+    else:
+        run_scraper()
+
+
 if __name__ == "__main__":
-    run_scraper()
+    main()
@@ -0,0 +1,257 @@
+import logging
+from urllib.parse import urlparse, urlsplit, urlunsplit, parse_qsl, urlencode
+from scraper.config import API_PATTERNS_PATH, MAX_API_PAGES, TIMEOUT
+from scraper.metrics import get_metrics
+from scraper.profiles import ProfileStore
+from scraper.structured import loads, find_products_in_json, is_shopify_endpoint, is_shopify_ajax
+
+logger = logging.getLogger(__name__)
+
+PAGE_PARAMS = ('page', 'p', 'pageNumber', 'page_number', 'pageIndex', 'currentPage')
+OFFSET_PARAMS = ('offset', 'start', 'from', 'skip')
+
+_patterns = None
+
+
+def get_pattern_store():
+    global _patterns
+    if _patterns is None:
+        _patterns = ProfileStore(API_PATTERNS_PATH)
+    return _patterns
+
+
+def _split_param(url, names):
+    """Devuelve (url sin el parámetro, nombre, valor) del primer parámetro de paginación"""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    for name, value in query:
+        if name in names and value.isdigit():
+            rest = [(k, v) for k, v in query if k != name]
+            return urlunsplit(parts._replace(query=urlencode(rest))), name, int(value)
+    return url, None, None
+
+
+def _with_param(url, name, value):
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != name]
+    query.append((name, str(value)))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def _paging(url):
+    """(endpoint, parámetro, valor, tipo) de una URL de API paginable"""
+    endpoint, name, value = _split_param(url, PAGE_PARAMS)
+    if name is not None:
+        return endpoint, name, value, 'page'
+    endpoint, name, value = _split_param(url, OFFSET_PARAMS)
+    if name is not None:
+        return endpoint, name, value, 'offset'
+    return url, 'page', 1, 'page'
+
+
+def infer_pattern(captured):
+    """Elige el endpoint de producto capturado y cómo paginarlo"""
+    candidates = {}
+    for capture in captured:
+        if capture['method'] != 'GET':
+            continue
+
+        endpoint, name, value, kind = _paging(capture['url'])
+        key = (endpoint, name)
+        count = len(capture['products'])
+        best = candidates.get(key)
+        if best is None:
+            candidates[key] = {
+                'endpoint': endpoint, 'param': name, 'kind': kind,
+                'start': value, 'page_size': count, 'hits': 1,
+            }
+        else:
+            best['start'] = min(best['start'], value)
+            best['page_size'] = max(best['page_size'], count)
+            best['hits'] += 1
+
+    if not candidates:
+        return None
+
+    pattern = max(candidates.values(), key=lambda p: (p['hits'], p['page_size']))
+    # Las respuestas capturadas suelen empezar en la segunda página (la primera viene en el HTML)
+    if pattern['kind'] == 'offset':
+        pattern['start'] = 0
+    elif pattern['start'] > 1:
+        pattern['start'] = 1
+    return pattern
+
+
+def shopify_pattern(url):
+    """Patrón conocido de Shopify: /collections/<handle>/products.json"""
+    parts = urlsplit(url)
+    segments = [s for s in parts.path.split('/') if s]
+    if 'collections' not in segments:
+        return None
+    index = segments.index('collections')
+    if index + 1 >= len(segments):
+        return None
+
+    path = '/' + '/'.join(segments[:index + 2]) + '/products.json'
+    endpoint = urlunsplit((parts.scheme, parts.netloc, path, 'limit=250', ''))
+    return {'endpoint': endpoint, 'param': 'page', 'kind': 'page', 'start': 1, 'page_size': 250}
+
+
+def harvest(pattern, page_url, brand, session=None, keepalive=None):
+    """Pagina el endpoint directamente hasta que deja de devolver productos nuevos.
+
+    `keepalive` se llama antes de cada página (el worker amplía ahí su reserva).
+    """
+    if session is None:
+        from scraper.utils.session import get_session
+        session = get_session()
+    metrics = get_metrics()
+    domain = urlparse(page_url).netloc
+
+    products = []
+    seen = set()
+    value = pattern['start']
+    shopify = is_shopify_endpoint(pattern['endpoint'])
+    cents = is_shopify_ajax(pattern['endpoint'])
+
+    for _ in range(MAX_API_PAGES):
+        if keepalive:
+            keepalive()
+        url = _with_param(pattern['endpoint'], pattern['param'], value)
+        try:
+            with metrics.timer('scraper_fetch_seconds', stage='api', domain=domain):
+                response = session.get(url, timeout=TIMEOUT / 1000)
+            if response.status_code != 200:
+                break
+            data = loads(response.content)
+        except Exception as e:
+            logger.debug(f"API {url}: {e}")
+            break
+
+        metrics.inc('scraper_api_pages_total', domain=domain)
+        page = find_products_in_json(data, page_url, shopify=shopify, cents=cents)
+        new = []
+        for product in page:
+            key = product.url or product.nombre
+            if key not in seen:
+                seen.add(key)
+                product.set_brand(brand)
+                new.append(product)
+        if not new:
+            break
+
+        products.extend(new)
+        value += len(page) if pattern['kind'] == 'offset' else 1
+
+    if products:
+        logger.info(f"API {pattern['endpoint']}: {len(products)} productos")
+    return products
+
+
+def _share_cookies(fetcher, session):
+    try:
+        for cookie in fetcher.cookies():
+            session.cookies.set(
+                cookie['name'], cookie['value'],
+                domain=cookie.get('domain'), path=cookie.get('path', '/')
+            )
+    except Exception as e:
+        logger.debug(f"No se pudieron copiar las cookies: {e}")
+
+
+def _name_key(product):
+    return ' '.join(product.nombre.lower().split())
+
+
+def _merge(*groups):
+    """Une listas de productos sin repetir.
+
+    Dos productos con URL se comparan por URL; si a alguno le falta, por
+    nombre normalizado (las respuestas JSON a menudo no traen enlace).
+    """
+    products = []
+    urls, names, urlless_names = set(), set(), set()
+    for group in groups:
+        for product in group:
+            name = _name_key(product)
+            if product.url:
+                if product.url in urls or name in urlless_names:
+                    continue
+                urls.add(product.url)
+            else:
+                if name in names:
+                    continue
+                urlless_names.add(name)
+            names.add(name)
+            products.append(product)
+    return products
+
+
+def _listing_captures(captured, pattern, dom_products):
+    """Respuestas capturadas que son el listado de la página y no recomendaciones,
+    vistos recientemente o el carrito: las del endpoint paginable elegido o las
+    que comparten productos con el HTML."""
+    endpoint = pattern and (pattern['endpoint'], pattern['param'])
+    dom_urls = {p.url for p in dom_products if p.url}
+    dom_names = {_name_key(p) for p in dom_products}
+
+    listing = []
+    for capture in captured:
+        if endpoint and _paging(capture['url'])[:2] == endpoint:
+            listing.append(capture)
+        elif any(p.url in dom_urls or _name_key(p) in dom_names for p in capture['products']):
+            listing.append(capture)
+
+    if not listing and not dom_products and captured:
+        # Grid sólo por JS (POST/GraphQL): la respuesta más grande es el listado
+        listing.append(max(captured, key=lambda c: len(c['products'])))
+    return listing
+
+
+def scrape_products(url, parser, fetcher, session=None, keepalive=None):
+    """Productos de una URL: API conocida si la hay, si no navegador + captura de XHR.
+
+    Si durante la carga se ve una API de productos, se guarda su patrón y
+    se pagina entera; las siguientes visitas a la URL ya no abren el navegador.
+    Los productos de las respuestas capturadas que no se pueden volver a
+    pedir (POST, GraphQL...) se suman a los del HTML.
+    """
+    if session is None:
+        from scraper.utils.session import get_session
+        session = get_session()
+    store = get_pattern_store()
+    domain = urlparse(url).netloc
+    patterns = store.get(domain) or {}
+    brand = parser.brand()
+
+    for pattern in (patterns.get(url), shopify_pattern(url)):
+        if pattern:
+            products = harvest(pattern, url, brand, session, keepalive)
+            if products:
+                return products
+
+    if keepalive:
+        keepalive()
+    html = fetcher.get_page(url)
+    dom_products = parser.parse_products(html) if html else []
+
+    pattern = infer_pattern(fetcher.captured)
+    captured_products = [
+        p for capture in _listing_captures(fetcher.captured, pattern, dom_products)
+        for p in capture['products']
+    ]
+    for product in captured_products:
+        product.set_brand(brand)
+    products = _merge(dom_products, captured_products)
+    if len(products) > len(dom_products):
+        logger.info(f"{len(products) - len(dom_products)} productos más en las respuestas capturadas")
+
+    if pattern:
+        _share_cookies(fetcher, session)
+        api_products = harvest(pattern, url, brand, session, keepalive)
+        if len(api_products) > len(products):
+            store.put(domain, dict(patterns, **{url: pattern}))
+            logger.info(f"Patrón de API aprendido para {url}")
+            return _merge(api_products, products)
+
+    return products
@@ -1,7 +1,15 @@
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+# python-dotenv sólo se importa si hay un .env que cargar
+_ENV_PATHS = [
+    os.path.join(os.getcwd(), '.env'),
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env'),
+]
+for _env_path in _ENV_PATHS:
+    if os.path.exists(_env_path):
+        from dotenv import load_dotenv
+        load_dotenv(_env_path)
+        break
 
 MAX_RETRIES = int(os.getenv('MAX_RETRIES', 3))
 TIMEOUT = int(os.getenv('TIMEOUT', 60000))
@@ -11,6 +19,32 @@ MAX_DELAY = float(os.getenv('MAX_DELAY', 5))
 MAX_PRODUCTS_PER_CATEGORY = int(os.getenv('MAX_PRODUCTS_PER_CATEGORY', 100))
 MAX_CATEGORIES = int(os.getenv('MAX_CATEGORIES', 50))
 
+QUEUE_BACKEND = os.getenv('QUEUE_BACKEND', 'sqlite').lower()
+QUEUE_URL = os.getenv('QUEUE_URL', 'data/queue.db')
+LEASE_TIMEOUT = float(os.getenv('LEASE_TIMEOUT', 300))
+RESULT_BATCH_SIZE = int(os.getenv('RESULT_BATCH_SIZE', 500))
+
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+
+PROFILES_PATH = os.getenv('PROFILES_PATH', 'data/profiles.json')
+PROFILE_MIN_YIELD_RATIO = float(os.getenv('PROFILE_MIN_YIELD_RATIO', 0.7))
+
+CAPTURE_API = os.getenv('CAPTURE_API', 'true').lower() == 'true'
+API_PATTERNS_PATH = os.getenv('API_PATTERNS_PATH', 'data/api_patterns.json')
+MAX_API_PAGES = int(os.getenv('MAX_API_PAGES', 50))
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 10))
+
+BLOCK_IMAGES = os.getenv('BLOCK_IMAGES', 'false').lower() == 'true'
+IMAGE_DIR = os.getenv('IMAGE_DIR', 'data/images')
+IMAGE_CONCURRENCY = int(os.getenv('IMAGE_CONCURRENCY', 8))
+IMAGE_BANDWIDTH = int(os.getenv('IMAGE_BANDWIDTH', 2 * 1024 * 1024))
+IMAGE_THUMB_SIZE = int(os.getenv('IMAGE_THUMB_SIZE', 256))
+
+QUERY_PORT = int(os.getenv('QUERY_PORT', 8080))
+QUERY_CHUNK_SIZE = int(os.getenv('QUERY_CHUNK_SIZE', 50000))
+QUERY_MAX_LIMIT = int(os.getenv('QUERY_MAX_LIMIT', 1000))
+
 
 GENERIC_SELECTORS = {
     'product_card': [
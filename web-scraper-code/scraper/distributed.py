@@ -0,0 +1,150 @@
+import time
+import logging
+import threading
+from scraper.config import QUEUE_BACKEND, QUEUE_URL, LEASE_TIMEOUT, RESULT_BATCH_SIZE
+from scraper.parser import UniversalParser
+from scraper.api_harvest import scrape_products
+from scraper.work_queue import get_queue
+
+logger = logging.getLogger(__name__)
+
+# Playwright y pandas se importan sólo en el rol que los usa: los workers
+# no necesitan pandas y el coordinador con manifiesto no abre navegador.
+
+
+def discover_tasks(url, fetcher=None):
+    """Genera tareas a partir de las categorías detectadas en una página"""
+    from scraper.fetcher import PlaywrightFetcher
+
+    own_fetcher = fetcher is None
+    fetcher = fetcher or PlaywrightFetcher()
+    try:
+        html = fetcher.get_page(url)
+    finally:
+        if own_fetcher:
+            fetcher.close()
+
+    if not html:
+        return []
+    return UniversalParser(url).find_categories(html)
+
+
+def process_task(task, fetcher, session=None, keepalive=None):
+    products = scrape_products(
+        task['url'], UniversalParser(task['url']), fetcher, session, keepalive
+    )
+    for product in products:
+        product.classify(task.get('genero', 'Sin clasificar'), task.get('categoria', 'General'))
+    return products
+
+
+def _worker_loop(queue, fetcher, stop_event, idle_timeout, visibility_timeout, session=None):
+    idle_since = time.time()
+    processed = 0
+
+    while not stop_event.is_set():
+        task = queue.lease(visibility_timeout)
+        if task is None:
+            if idle_timeout is not None and time.time() - idle_since > idle_timeout:
+                break
+            stop_event.wait(1)
+            continue
+
+        def keepalive(task=task):
+            # Una tarea larga (reintentos de get_page + muchas páginas de API) supera LEASE_TIMEOUT
+            if not queue.touch(task['id'], visibility_timeout):
+                logger.warning(f"La reserva de {task['url']} ya había caducado")
+
+        try:
+            products = process_task(task, fetcher, session, keepalive)
+            queue.push_results(products)
+            queue.ack(task['id'])
+            processed += 1
+            logger.info(f"{len(products)} productos en {task['url']}")
+        except Exception as e:
+            logger.error(f"Error procesando {task['url']}: {e}")
+            queue.nack(task['id'])
+        idle_since = time.time()
+
+    return processed
+
+
+def run_worker(pool_size=1, backend=QUEUE_BACKEND, url=QUEUE_URL, idle_timeout=None,
+               visibility_timeout=LEASE_TIMEOUT):
+    """Arranca `pool_size` navegadores que consumen tareas de la cola compartida.
+
+    Cada hilo tiene su propio PlaywrightFetcher, su propia conexión a la
+    cola y su propia sesión HTTP (con las cookies de su navegador), porque
+    ninguno se puede compartir entre hilos.
+    """
+    from scraper.fetcher import PlaywrightFetcher
+    from scraper.utils.session import new_session
+
+    stop_event = threading.Event()
+    totals = []
+
+    def target():
+        queue = get_queue(backend, url)
+        fetcher = PlaywrightFetcher()
+        session = new_session()
+        try:
+            totals.append(_worker_loop(
+                queue, fetcher, stop_event, idle_timeout, visibility_timeout, session
+            ))
+        finally:
+            session.close()
+            fetcher.close()
+            queue.close()
+
+    threads = [threading.Thread(target=target, daemon=True) for _ in range(pool_size)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        stop_event.set()
+        for thread in threads:
+            thread.join()
+
+    return sum(totals)
+
+
+def run_coordinator(queue, storage=None, poll_interval=5, batch_size=RESULT_BATCH_SIZE):
+    """Recoge los lotes de los workers y los escribe en el almacenamiento central.
+
+    Termina cuando no quedan tareas pendientes ni resultados por recoger.
+    """
+    if storage is None:
+        from scraper.storage import Storage
+        storage = Storage()
+    buffer = []
+    total = 0
+
+    def flush():
+        nonlocal buffer, total
+        if buffer:
+            storage.save_raw(buffer, 'distribuido')
+            storage.save_processed(buffer)
+            total += len(buffer)
+            buffer = []
+
+    while True:
+        products = queue.pop_results()
+        buffer.extend(products)
+
+        if len(buffer) >= batch_size:
+            flush()
+
+        if not products:
+            if queue.pending() == 0:
+                # Los resultados se publican antes del ack, así que no quedan lotes en vuelo
+                buffer.extend(queue.pop_results())
+                break
+            flush()
+            time.sleep(poll_interval)
+
+    flush()
+    logger.info(f"Coordinador terminado: {total} productos recibidos")
+    return total
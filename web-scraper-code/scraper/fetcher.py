@@ -1,7 +1,12 @@
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
-from scraper.config import TIMEOUT, HEADLESS
+from scraper.config import TIMEOUT, HEADLESS, CAPTURE_API, BLOCK_IMAGES
 from scraper.utils.retry import retry_on_failure, random_delay
 from scraper.utils.headers import get_random_user_agent
+from scraper.metrics import get_metrics
+from scraper.structured import (
+    loads, find_products_in_json, is_shopify_endpoint, is_shopify_ajax
+)
+from urllib.parse import urlparse
 import logging
 import sys
 
@@ -11,11 +16,13 @@ logger = logging.getLogger(__name__)
 class PlaywrightFetcher:
     """Fetcher usando Playwright para manejar JavaScript"""
 
-    def __init__(self):
+    def __init__(self, capture_responses=CAPTURE_API):
         self.playwright = None
         self.browser = None
         self.context = None
         self.page = None
+        self.capture_responses = capture_responses
+        self.captured = []
 
     def start(self):
         try:
@@ -28,15 +35,18 @@ class PlaywrightFetcher:
                 except:
                     pass
 
+            args = [
+                '--disable-blink-features=AutomationControlled',
+                '--disable-dev-shm-usage',
+                '--no-sandbox'
+            ]
+            if BLOCK_IMAGES:
+                # Las imágenes se descargan aparte (scraper.images); aquí sólo hace falta su URL.
+                # Con un flag de Blink y no con context.route, que desactiva la caché HTTP
+                args.append('--blink-settings=imagesEnabled=false')
+
             self.playwright = sync_playwright().start()
-            self.browser = self.playwright.chromium.launch(
-                headless=HEADLESS,
-                args=[
-                    '--disable-blink-features=AutomationControlled',
-                    '--disable-dev-shm-usage',
-                    '--no-sandbox'
-                ]
-            )
+            self.browser = self.playwright.chromium.launch(headless=HEADLESS, args=args)
             self.context = self.browser.new_context(
                 user_agent=get_random_user_agent(),
                 viewport={'width': 1920, 'height': 1080},
@@ -56,40 +66,57 @@ class PlaywrightFetcher:
         if not self.page:
             self.start()
 
+        metrics = get_metrics()
+        domain = urlparse(url).netloc
+
+        self.captured = []
+        responses = []
+        on_response = responses.append
+        if self.capture_responses:
+            self.page.on('response', on_response)
+
         try:
             logger.info(f"Cargando: {url}")
+            metrics.inc('scraper_pages_total', domain=domain)
 
-            self.page.goto(
-                url,
-                wait_until='networkidle',
-                timeout=TIMEOUT
-            )
+            with metrics.timer('scraper_fetch_seconds', stage='navigation', domain=domain):
+                self.page.goto(
+                    url,
+                    wait_until='networkidle',
+                    timeout=TIMEOUT
+                )
 
-            self.page.wait_for_timeout(5000)
+            with metrics.timer('scraper_fetch_seconds', stage='readiness', domain=domain):
+                self.page.wait_for_timeout(5000)
 
-            for i in range(4):
-                self.page.evaluate(
-                    f"window.scrollTo(0, document.body.scrollHeight * {(i + 1) / 4});"
-                )
-                self.page.wait_for_timeout(2000)
+            with metrics.timer('scraper_fetch_seconds', stage='scroll', domain=domain):
+                for i in range(4):
+                    self.page.evaluate(
+                        f"window.scrollTo(0, document.body.scrollHeight * {(i + 1) / 4});"
+                    )
+                    self.page.wait_for_timeout(2000)
+
+                self.page.evaluate("window.scrollTo(0, 0);")
+                self.page.wait_for_timeout(1000)
 
-            self.page.evaluate("window.scrollTo(0, 0);")
-            self.page.wait_for_timeout(1000)
+            if responses:
+                self.captured = self._collect_json(responses, url)
 
             try:
-                cookie_buttons = [
-                    'button[id*="cookie"]',
-                    'button[class*="cookie"]',
-                    'button:has-text("Aceptar")',
-                    'button:has-text("Accept")',
-                    'a:has-text("Aceptar")'
-                ]
-                for selector in cookie_buttons:
-                    if self.page.query_selector(selector):
-                        self.page.click(selector, timeout=2000)
-                        self.page.wait_for_timeout(1000)
-                        logger.info("Cookies aceptadas")
-                        break
+                with metrics.timer('scraper_fetch_seconds', stage='cookies', domain=domain):
+                    cookie_buttons = [
+                        'button[id*="cookie"]',
+                        'button[class*="cookie"]',
+                        'button:has-text("Aceptar")',
+                        'button:has-text("Accept")',
+                        'a:has-text("Aceptar")'
+                    ]
+                    for selector in cookie_buttons:
+                        if self.page.query_selector(selector):
+                            self.page.click(selector, timeout=2000)
+                            self.page.wait_for_timeout(1000)
+                            logger.info("Cookies aceptadas")
+                            break
             except:
                 pass
 
@@ -99,6 +126,9 @@ class PlaywrightFetcher:
 
         except PlaywrightTimeoutError:
             logger.error(f"Timeout al cargar {url}")
+            metrics.inc('scraper_timeouts_total', domain=domain)
+            if responses:
+                self.captured = self._collect_json(responses, url)
             try:
                 return self.page.content()
             except:
@@ -106,8 +136,47 @@ class PlaywrightFetcher:
 
         except Exception as e:
             logger.error(f"Error al cargar {url}: {e}")
+            metrics.inc('scraper_fetch_errors_total', domain=domain)
             raise
 
+        finally:
+            if self.capture_responses:
+                self.page.remove_listener('response', on_response)
+
+    def _collect_json(self, responses, page_url):
+        """Se queda con las respuestas XHR/fetch en JSON que contienen productos"""
+        captured = []
+        for response in responses:
+            try:
+                request = response.request
+                if request.resource_type not in ('xhr', 'fetch'):
+                    continue
+                if 'json' not in response.headers.get('content-type', ''):
+                    continue
+                data = loads(response.body())
+            except Exception:
+                continue
+
+            products = find_products_in_json(
+                data, page_url,
+                shopify=is_shopify_endpoint(response.url), cents=is_shopify_ajax(response.url)
+            )
+            if len(products) >= 2:
+                captured.append({
+                    'url': response.url,
+                    'method': request.method,
+                    'products': products,
+                })
+
+        if captured:
+            logger.info(f"{len(captured)} respuestas JSON con productos capturadas")
+        return captured
+
+    def cookies(self):
+        if not self.context:
+            return []
+        return self.context.cookies()
+
     def click_load_more(self, selector):
         try:
             if self.page.query_selector(selector):
@@ -0,0 +1,221 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from scraper.config import (
+    IMAGE_DIR, IMAGE_CONCURRENCY, IMAGE_BANDWIDTH, IMAGE_THUMB_SIZE, TIMEOUT
+)
+from scraper.metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+IMAGE_COLUMNS = ['imagen_ancho', 'imagen_alto', 'imagen_sha256', 'imagen_phash', 'miniatura']
+CHUNK_SIZE = 64 * 1024
+
+
+class BandwidthLimiter:
+    """Cubo de tokens por dominio: limita los bytes/s de descarga de cada tienda"""
+
+    def __init__(self, bytes_per_second):
+        self.rate = bytes_per_second
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def throttle(self, domain, nbytes):
+        if not self.rate:
+            return
+        with self._lock:
+            tokens, last = self._buckets.get(domain, (self.rate, time.monotonic()))
+            now = time.monotonic()
+            tokens = min(self.rate, tokens + (now - last) * self.rate) - nbytes
+            self._buckets[domain] = (tokens, now)
+        if tokens < 0:
+            time.sleep(-tokens / self.rate)
+
+
+def perceptual_hash(image):
+    """dHash de 64 bits: compara cada píxel con su vecino en una miniatura 9x8 en grises"""
+    from PIL import Image
+
+    small = image.convert('L').resize((9, 8), Image.LANCZOS)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            bits = (bits << 1) | (left > right)
+    return f'{bits:016x}'
+
+
+class ImagePipeline:
+    """Descarga, deduplica y miniaturiza las imágenes de los productos.
+
+    Cada hilo de descarga tiene su propia sesión HTTP (una Session de
+    requests no se comparte entre hilos), aparte de la de las páginas.
+    Lo ya procesado queda en `manifest.jsonl`, así que una
+    ejecución interrumpida continúa donde lo dejó.
+
+    Sólo los ficheros idénticos (mismo sha256) comparten miniatura. El
+    hash perceptual se guarda y cuenta como posible duplicado, pero no se
+    usa para compartir: las variantes de color de una misma foto coinciden.
+    """
+
+    def __init__(self, image_dir=IMAGE_DIR, concurrency=IMAGE_CONCURRENCY,
+                 bandwidth=IMAGE_BANDWIDTH, thumb_size=IMAGE_THUMB_SIZE, session_factory=None):
+        self.image_dir = image_dir
+        self.parts_dir = os.path.join(image_dir, 'parts')
+        self.manifest_path = os.path.join(image_dir, 'manifest.jsonl')
+        self.concurrency = concurrency
+        self.thumb_size = thumb_size
+        self.limiter = BandwidthLimiter(bandwidth)
+        self.session_factory = session_factory or self._new_session
+        self.metrics = get_metrics()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._sessions = []
+        self.done = {}
+        self.by_phash = {}  # phash -> sha256 de la primera imagen vista con él
+        os.makedirs(self.parts_dir, exist_ok=True)
+        self._load_manifest()
+
+    @staticmethod
+    def _new_session():
+        import requests
+        from scraper.utils.headers import get_headers
+
+        session = requests.Session()
+        session.headers.update(get_headers())
+        session.headers['Accept'] = 'image/avif,image/webp,image/*,*/*;q=0.8'
+        return session
+
+    @property
+    def session(self):
+        """Sesión del hilo de descarga actual"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = self.session_factory()
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return
+        with open(self.manifest_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self.done[entry['imagen']] = entry
+                self.by_phash.setdefault(entry['imagen_phash'], entry['imagen_sha256'])
+        logger.info(f"{len(self.done)} imágenes ya procesadas")
+
+    def _thumbnail_path(self, digest):
+        return os.path.join(self.image_dir, digest[:2], f'{digest}.jpg')
+
+    def _record(self, entry):
+        with self._lock:
+            self.done[entry['imagen']] = entry
+            with open(self.manifest_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def run(self, urls):
+        """Procesa las URLs pendientes y devuelve los metadatos de todas las pedidas"""
+        urls = list(dict.fromkeys(u for u in urls if isinstance(u, str) and u.startswith('http')))
+        pending = [u for u in urls if u not in self.done]
+        logger.info(f"Imágenes: {len(pending)} pendientes de {len(urls)}")
+
+        if pending:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                for _ in executor.map(self._process_safely, pending):
+                    pass
+        return [self.done[u] for u in urls if u in self.done]
+
+    def _process_safely(self, url):
+        try:
+            self._process(url)
+        except Exception as e:
+            self.metrics.inc('scraper_image_errors_total', domain=urlparse(url).netloc)
+            logger.warning(f"Error con la imagen {url}: {e}")
+
+    def _download(self, url):
+        """Descarga con reanudación: si quedó un .part se pide el resto con Range"""
+        domain = urlparse(url).netloc
+        part_path = os.path.join(self.parts_dir, hashlib.sha1(url.encode()).hexdigest() + '.part')
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {'Range': f'bytes={offset}-'} if offset else {}
+
+        with self.metrics.timer('scraper_image_download_seconds', domain=domain):
+            with self.session.get(url, headers=headers, stream=True,
+                                  timeout=TIMEOUT / 1000) as response:
+                # 416: el .part ya tenía el fichero completo
+                if response.status_code != 416:
+                    if response.status_code not in (200, 206):
+                        raise IOError(f"HTTP {response.status_code}")
+
+                    mode = 'ab' if response.status_code == 206 else 'wb'
+                    with open(part_path, mode) as f:
+                        for chunk in response.iter_content(CHUNK_SIZE):
+                            f.write(chunk)
+                            self.limiter.throttle(domain, len(chunk))
+                            self.metrics.inc('scraper_image_bytes_total', len(chunk), domain=domain)
+
+        with open(part_path, 'rb') as f:
+            data = f.read()
+        os.remove(part_path)
+        return data
+
+    def _process(self, url):
+        from PIL import Image
+
+        data = self._download(url)
+        digest = hashlib.sha256(data).hexdigest()
+
+        domain = urlparse(url).netloc
+        thumbnail = self._thumbnail_path(digest)
+
+        with Image.open(io.BytesIO(data)) as image:
+            width, height = image.size
+            phash = perceptual_hash(image)
+
+            if os.path.exists(thumbnail):
+                self.metrics.inc('scraper_image_duplicates_total', domain=domain, kind='exact')
+            else:
+                os.makedirs(os.path.dirname(thumbnail), exist_ok=True)
+                thumb = image.convert('RGB')
+                thumb.thumbnail((self.thumb_size, self.thumb_size))
+                # Temporal propio de cada hilo: la ruta sólo aparece cuando el fichero está completo
+                tmp_path = f'{thumbnail}.{threading.get_ident()}.tmp'
+                try:
+                    thumb.save(tmp_path, 'JPEG', quality=85)
+                    os.replace(tmp_path, thumbnail)
+                finally:
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+
+        with self._lock:
+            first_digest = self.by_phash.setdefault(phash, digest)
+        if first_digest != digest:
+            self.metrics.inc('scraper_image_duplicates_total', domain=domain, kind='perceptual')
+
+        self._record({
+            'imagen': url,
+            'imagen_ancho': width,
+            'imagen_alto': height,
+            'imagen_sha256': digest,
+            'imagen_phash': phash,
+            'miniatura': thumbnail,
+        })
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions = []
@@ -0,0 +1,191 @@
+import json
+import time
+import threading
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+COUNT_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class Histogram:
+    """Histograma acumulativo al estilo Prometheus"""
+
+    def __init__(self, buckets=SECONDS_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'min': self.min,
+            'max': self.max,
+            'mean': round(self.sum / self.count, 6) if self.count else None,
+            'buckets': {str(b): c for b, c in zip(self.buckets, self.counts)},
+        }
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key, extra=None):
+    items = list(key) + (extra or [])
+    if not items:
+        return ''
+    escaped = (
+        f'{k}="' + v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for k, v in items
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+class MetricsRegistry:
+    """Contadores e histogramas del proceso, con etiquetas libres"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets=SECONDS_BUCKETS, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def to_prometheus(self):
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+
+            seen = set()
+            for (name, key), value in counters:
+                if name not in seen:
+                    seen.add(name)
+                    lines.append(f'# TYPE {name} counter')
+                lines.append(f'{name}{_format_labels(key)} {value}')
+
+            for (name, key), histogram in histograms:
+                if name not in seen:
+                    seen.add(name)
+                    lines.append(f'# TYPE {name} histogram')
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(
+                        f'{name}_bucket{_format_labels(key, [("le", str(bound))])} {count}'
+                    )
+                lines.append(
+                    f'{name}_bucket{_format_labels(key, [("le", "+Inf")])} {histogram.count}'
+                )
+                lines.append(f'{name}_sum{_format_labels(key)} {histogram.sum}')
+                lines.append(f'{name}_count{_format_labels(key)} {histogram.count}')
+
+        return '\n'.join(lines) + '\n'
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'generated_at': datetime.now().isoformat(timespec='seconds'),
+                'counters': [
+                    {'name': name, 'labels': dict(key), 'value': value}
+                    for (name, key), value in sorted(self._counters.items())
+                ],
+                'histograms': [
+                    dict({'name': name, 'labels': dict(key)}, **histogram.to_dict())
+                    for (name, key), histogram in sorted(
+                        self._histograms.items(), key=lambda item: item[0]
+                    )
+                ],
+            }
+
+    def write_report(self, log_file):
+        """Escribe el informe JSON y el texto Prometheus junto al log de la ejecución"""
+        base = log_file[:-4] if log_file.endswith('.log') else log_file
+        json_path = f'{base}.json'
+        prom_path = f'{base}.prom'
+
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        with open(prom_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+
+        logger.info(f"Métricas guardadas: {json_path}")
+        return json_path
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics():
+    return _registry
+
+
+def start_metrics_server(port, host='127.0.0.1'):
+    """Sirve /metrics (Prometheus) y /metrics.json en un hilo en segundo plano"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path.split('?')[0] == '/metrics':
+                body = _registry.to_prometheus().encode('utf-8')
+                content_type = 'text/plain; version=0.0.4; charset=utf-8'
+            elif self.path.split('?')[0] == '/metrics.json':
+                body = json.dumps(_registry.to_dict(), ensure_ascii=False).encode('utf-8')
+                content_type = 'application/json'
+            else:
+                self.send_error(404)
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    logger.info(f"Métricas disponibles en http://{host}:{port}/metrics")
+    return server
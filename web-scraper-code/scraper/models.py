@@ -0,0 +1,63 @@
+import sys
+
+PRODUCT_FIELDS = ('marca', 'genero', 'categoria', 'nombre', 'precio', 'url', 'imagen')
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Product:
+    """Producto compacto: sin __dict__ y con marca/genero/categoria internados.
+
+    Las tres columnas repetidas comparten un único objeto str por valor, así
+    que cientos de miles de productos apenas añaden memoria por ellas.
+    """
+
+    __slots__ = PRODUCT_FIELDS
+
+    def __init__(self, marca=None, genero=None, categoria=None,
+                 nombre=None, precio=None, url=None, imagen=None):
+        self.marca = _intern(marca)
+        self.genero = _intern(genero)
+        self.categoria = _intern(categoria)
+        self.nombre = nombre
+        self.precio = precio
+        self.url = url
+        self.imagen = imagen
+
+    def classify(self, genero, categoria):
+        self.genero = _intern(genero)
+        self.categoria = _intern(categoria)
+
+    def set_brand(self, marca):
+        self.marca = _intern(marca)
+
+    def is_valid(self):
+        return bool(self.nombre) and bool(self.precio)
+
+    def to_tuple(self):
+        return (self.marca, self.genero, self.categoria,
+                self.nombre, self.precio, self.url, self.imagen)
+
+    def __repr__(self):
+        return f"Product(marca={self.marca!r}, nombre={self.nombre!r}, precio={self.precio!r})"
+
+
+def to_columns(products):
+    """Lista de productos -> dict de columnas, en una sola pasada"""
+    columns = {field: [] for field in PRODUCT_FIELDS}
+    appends = [columns[field].append for field in PRODUCT_FIELDS]
+    for product in products:
+        for append, value in zip(appends, product.to_tuple()):
+            append(value)
+    return columns
+
+
+def to_frame(products):
+    """DataFrame con el esquema del CSV. Si ya es un DataFrame se devuelve tal cual."""
+    import pandas as pd
+
+    if isinstance(products, pd.DataFrame):
+        return products
+    return pd.DataFrame(to_columns(products), columns=list(PRODUCT_FIELDS))
@@ -1,8 +1,14 @@
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 import re
+import sys
+import time
 import logging
-from scraper.config import GENERIC_SELECTORS, CATEGORY_KEYWORDS
+from collections import Counter, defaultdict
+from scraper.config import GENERIC_SELECTORS, CATEGORY_KEYWORDS, PROFILE_MIN_YIELD_RATIO
+from scraper.metrics import get_metrics, COUNT_BUCKETS
+from scraper.models import Product
+from scraper.profiles import get_profile_store, PROFILE_FIELDS
+from scraper.structured import extract_products, extract_shopify_prices
 
 logger = logging.getLogger(__name__)
 
@@ -10,12 +16,17 @@ logger = logging.getLogger(__name__)
 class UniversalParser:
     """Parser adaptable a diferentes estructuras de sitios"""
 
-    def __init__(self, base_url):
+    def __init__(self, base_url, profile_store=None):
         self.base_url = base_url
         self.domain = urlparse(base_url).netloc
         self.soup = None
+        self.metrics = get_metrics()
+        self.profile_store = profile_store or get_profile_store()
+        self._field_hits = None
 
     def parse_html(self, html):
+        # bs4 sólo hace falta cuando no hay datos estructurados
+        from bs4 import BeautifulSoup
         self.soup = BeautifulSoup(html, 'html.parser')
         return self.soup
 
@@ -77,17 +88,81 @@ class UniversalParser:
         return None
 
     def parse_products(self, html):
-        self.parse_html(html)
+        start = time.perf_counter()
+
+        structured = self._parse_structured(html)
+        # Sin URL los productos estructurados no bastan: el HTML puede tener los enlaces
+        if sum(1 for product in structured if product.url) > 5:
+            product_cards, products = structured, structured
+        else:
+            product_cards, products = self._parse_dom(html)
+            if len(structured) > len(products):
+                product_cards, products = structured, structured
+
+        logger.info(f"{len(products)} productos válidos extraídos")
+        self.metrics.observe('scraper_parse_seconds', time.perf_counter() - start, domain=self.domain)
+        self.metrics.observe(
+            'scraper_cards_found', len(product_cards), buckets=COUNT_BUCKETS, domain=self.domain
+        )
+        self.metrics.observe(
+            'scraper_products_extracted', len(products), buckets=COUNT_BUCKETS, domain=self.domain
+        )
+        return products
+
+    def _parse_structured(self, html):
         products = []
+        for product in extract_products(html, self.base_url):
+            product.set_brand(self.brand())
+            products.append(product)
 
+        if products:
+            logger.info(f"Datos estructurados: {len(products)} productos")
+            self._count_hit('product_card', 'structured')
+        return products
+
+    def _parse_dom(self, html):
+        self.parse_html(html)
+
+        profile = self.profile_store.get(self.domain)
+        if profile:
+            product_cards, products = self._parse_with_profile(profile)
+            if self._needs_relearn(profile, product_cards, products):
+                logger.info(f"El perfil de {self.domain} ya no rinde, reaprendiendo")
+                self.metrics.inc('scraper_profile_relearns_total', domain=self.domain)
+                generic_cards, generic_products, learned = self._parse_generic()
+                # Sólo se sustituye el perfil si la cascada genérica saca más productos
+                if len(generic_products) > len(products):
+                    product_cards, products = generic_cards, generic_products
+                    if learned:
+                        self.profile_store.save(self.domain, *learned)
+        else:
+            product_cards, products, learned = self._parse_generic()
+            if learned:
+                self.profile_store.save(self.domain, *learned)
+
+        exact_prices = extract_shopify_prices(html)
+        if exact_prices:
+            for product in products:
+                price = exact_prices.get(product.nombre.lower())
+                if price:
+                    product.precio = price
+
+        return product_cards, products
+
+    def _parse_generic(self):
+        """Cascada de selectores genéricos. Devuelve también el perfil a aprender, si hay."""
+        self._field_hits = defaultdict(Counter)
         product_cards = []
+        card_selector = None
 
         for selector in GENERIC_SELECTORS['product_card']:
             try:
                 cards = self.soup.select(selector)
                 if len(cards) > 5:
                     product_cards = cards
+                    card_selector = selector
                     logger.info(f"Selector válido: {selector} ({len(cards)} elementos)")
+                    self._count_hit('product_card', selector)
                     break
             except:
                 continue
@@ -95,20 +170,61 @@ class UniversalParser:
         if not product_cards:
             logger.warning("No se encontraron productos con selectores estándar")
             product_cards = self._find_by_price()
+            self._count_hit('product_card', 'price_scan')
 
         logger.info(f"{len(product_cards)} tarjetas encontradas")
+        products = self._extract_all(product_cards)
+
+        learned = None
+        if card_selector and products:
+            selectors = {
+                field: self._field_hits[field].most_common(1)[0][0]
+                for field in PROFILE_FIELDS[1:]
+                if self._field_hits[field]
+            }
+            selectors['product_card'] = card_selector
+            learned = (selectors, len(product_cards), len(products))
+
+        self._field_hits = None
+        return product_cards, products, learned
+
+    def _parse_with_profile(self, profile):
+        try:
+            product_cards = self.soup.select(profile['product_card'])
+        except:
+            product_cards = []
+        self._count_hit('product_card', profile['product_card'])
+        logger.info(f"Perfil aprendido: {profile['product_card']} ({len(product_cards)} elementos)")
+
+        selectors = {
+            field: [profile[field]] if profile.get(field) else GENERIC_SELECTORS[field]
+            for field in PROFILE_FIELDS[1:]
+        }
+        return product_cards, self._extract_all(product_cards, selectors)
+
+    def _needs_relearn(self, profile, product_cards, products):
+        # Pocas tarjetas es una página pequeña, no un perfil roto; ninguna sí lo es
+        if not product_cards:
+            return True
+        success_rate = len(products) / len(product_cards)
+        return success_rate < profile.get('success_rate', 0) * PROFILE_MIN_YIELD_RATIO
 
+    def _extract_all(self, product_cards, selectors=GENERIC_SELECTORS):
+        products = []
         for card in product_cards:
             try:
-                product = self._extract_product_data(card)
-                if product and product.get('nombre') and product.get('precio'):
+                product = self._extract_product_data(card, selectors)
+                if product.is_valid():
                     products.append(product)
             except Exception as e:
                 logger.debug(f"Error parseando producto: {e}")
-
-        logger.info(f"{len(products)} productos válidos extraídos")
         return products
 
+    def _count_hit(self, field, selector):
+        self.metrics.inc('scraper_selector_hits_total', domain=self.domain, field=field, selector=selector)
+        if self._field_hits is not None:
+            self._field_hits[field][selector] += 1
+
     def _find_by_price(self):
         price_pattern = re.compile(r'[€$£]\s*\d+[.,]?\d*|\d+[.,]?\d*\s*[€$£]')
         elements_with_price = []
@@ -119,44 +235,47 @@ class UniversalParser:
 
         return elements_with_price[:50]
 
-    def _extract_product_data(self, card):
-        product = {}
+    def _extract_product_data(self, card, selectors=GENERIC_SELECTORS):
+        product = Product(marca=self.brand())
 
-        for selector in GENERIC_SELECTORS['product_name']:
+        for selector in selectors['product_name']:
             try:
                 name_elem = card.select_one(selector)
                 if name_elem:
                     name = name_elem.get_text(strip=True)
                     if len(name) > 3:
-                        product['nombre'] = name
+                        product.nombre = name
+                        self._count_hit('product_name', selector)
                         break
             except:
                 continue
 
-        for selector in GENERIC_SELECTORS['product_price']:
+        for selector in selectors['product_price']:
             try:
                 price_elem = card.select_one(selector)
                 if price_elem:
                     parsed_price = self._parse_price(price_elem.get_text(strip=True))
                     if parsed_price and parsed_price > 0:
-                        product['precio'] = parsed_price
+                        product.precio = parsed_price
+                        self._count_hit('product_price', selector)
                         break
             except:
                 continue
 
-        if 'precio' not in product:
-            product['precio'] = self._parse_price(card.get_text())
+        if product.precio is None:
+            product.precio = self._parse_price(card.get_text())
 
-        for selector in GENERIC_SELECTORS['product_link']:
+        for selector in selectors['product_link']:
             try:
                 link_elem = card.select_one(selector)
                 if link_elem and link_elem.get('href'):
-                    product['url'] = urljoin(self.base_url, link_elem['href'])
+                    product.url = urljoin(self.base_url, link_elem['href'])
+                    self._count_hit('product_link', selector)
                     break
             except:
                 continue
 
-        for selector in GENERIC_SELECTORS['product_image']:
+        for selector in selectors['product_image']:
             try:
                 img_elem = card.select_one(selector)
                 if img_elem:
@@ -166,20 +285,22 @@ class UniversalParser:
                         or img_elem.get('data-lazy-src')
                     )
                     if img_src:
-                        product['imagen'] = urljoin(self.base_url, img_src)
+                        product.imagen = urljoin(self.base_url, img_src)
+                        self._count_hit('product_image', selector)
                         break
             except:
                 continue
 
-        product['marca'] = (
+        return product
+
+    def brand(self):
+        return sys.intern(
             self.domain.replace('www.', '')
             .replace('www2.', '')
             .split('.')[0]
             .upper()
         )
 
-        return product
-
     def _parse_price(self, price_text):
         if not price_text:
             return None
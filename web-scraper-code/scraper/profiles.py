@@ -0,0 +1,133 @@
+import json
+import os
+import tempfile
+import threading
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from scraper.config import PROFILES_PATH
+
+logger = logging.getLogger(__name__)
+
+PROFILE_FIELDS = ['product_card', 'product_name', 'product_price', 'product_link', 'product_image']
+
+
+@contextmanager
+def _file_lock(path):
+    """Bloqueo exclusivo entre procesos sobre `<path>.lock`"""
+    with open(f'{path}.lock', 'a+b') as f:
+        try:
+            import fcntl
+        except ImportError:
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class ProfileStore:
+    """Selectores aprendidos por dominio, persistidos en un JSON.
+
+    Varios procesos pueden compartir el fichero: cada escritura relee lo
+    que haya en disco bajo un bloqueo y sólo cambia su dominio.
+    Con `path=None` los perfiles sólo viven en memoria.
+    """
+
+    def __init__(self, path=PROFILES_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._profiles = None
+        self._mtime = None
+
+    def _mtime_on_disk(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _read(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except (ValueError, OSError) as e:
+            logger.warning(f"Perfiles inválidos, se ignoran: {e}")
+            return {}
+
+    def _load(self):
+        # Se relee si otro proceso ha escrito desde la última lectura
+        if self._profiles is None or (self.path and self._mtime_on_disk() != self._mtime):
+            self._mtime = self._mtime_on_disk() if self.path else None
+            self._profiles = self._read()
+        return self._profiles
+
+    def get(self, domain):
+        with self._lock:
+            return self._load().get(domain)
+
+    def save(self, domain, selectors, cards, products):
+        profile = {field: selectors[field] for field in PROFILE_FIELDS if selectors.get(field)}
+        profile.update({
+            'cards': cards,
+            'products': products,
+            'success_rate': round(products / cards, 3) if cards else 0.0,
+            'updated_at': datetime.now().isoformat(timespec='seconds'),
+        })
+
+        self.put(domain, profile)
+        logger.info(f"Perfil aprendido para {domain}: {profile['product_card']}")
+        return profile
+
+    def put(self, domain, profile):
+        self._update(lambda profiles: profiles.__setitem__(domain, profile))
+
+    def _update(self, change):
+        with self._lock:
+            if not self.path:
+                change(self._load())
+                return
+
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with _file_lock(self.path):
+                profiles = self._read()
+                change(profiles)
+                self._write(profiles)
+                self._profiles = profiles
+                self._mtime = self._mtime_on_disk()
+
+    def _write(self, profiles):
+        # Temporal propio de cada proceso: dos escrituras a la vez no se pisan el .tmp
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(self.path) or '.', prefix=os.path.basename(self.path), suffix='.tmp'
+        )
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(profiles, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+_store = None
+
+
+def get_profile_store():
+    global _store
+    if _store is None:
+        _store = ProfileStore()
+    return _store
@@ -0,0 +1,238 @@
+import importlib.util
+import json
+import os
+import logging
+from urllib.parse import urlparse, parse_qs
+import pandas as pd
+from scraper.config import QUERY_CHUNK_SIZE, QUERY_MAX_LIMIT
+from scraper.storage import summarize, AGGREGATE_KEYS
+
+logger = logging.getLogger(__name__)
+
+FILTER_COLUMNS = ('marca', 'genero', 'categoria')
+# El resto de columnas (marca, nombre, url, imagen, hashes, miniatura...) son texto
+NUMERIC_COLUMNS = ('precio', 'imagen_ancho', 'imagen_alto')
+
+
+def _as_list(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    values = [v.strip() for v in value if v and v.strip()]
+    return values or None
+
+
+class ProductQuery:
+    """Consultas sobre data/products.csv leyendo por bloques, sin cargarlo entero"""
+
+    def __init__(self, data_dir='data', chunksize=QUERY_CHUNK_SIZE):
+        self.data_dir = data_dir
+        self.products_path = os.path.join(data_dir, 'products.csv')
+        self.aggregates_path = os.path.join(data_dir, 'aggregates.csv')
+        self.chunksize = chunksize
+
+    def _chunks(self):
+        if not os.path.exists(self.products_path) or os.path.getsize(self.products_path) == 0:
+            return
+        try:
+            # Tipos fijos: un bloque con una columna vacía no debe cambiar de esquema
+            for chunk in pd.read_csv(
+                self.products_path, chunksize=self.chunksize, encoding='utf-8-sig', dtype=str
+            ):
+                for column in NUMERIC_COLUMNS:
+                    if column in chunk.columns:
+                        chunk[column] = pd.to_numeric(chunk[column], errors='coerce')
+                yield chunk
+        except pd.errors.EmptyDataError:
+            return
+
+    def _filter(self, chunk, marca=None, genero=None, categoria=None,
+                precio_min=None, precio_max=None):
+        mask = pd.Series(True, index=chunk.index)
+        for column, values in zip(FILTER_COLUMNS, (marca, genero, categoria)):
+            values = _as_list(values)
+            if values and column in chunk.columns:
+                mask &= chunk[column].isin(values)
+
+        if precio_min is not None or precio_max is not None:
+            precio = chunk['precio']
+            if precio_min is not None:
+                mask &= precio >= float(precio_min)
+            if precio_max is not None:
+                mask &= precio <= float(precio_max)
+        return chunk[mask]
+
+    def iter_frames(self, **filters):
+        """DataFrames filtrados, uno por bloque leído"""
+        for chunk in self._chunks():
+            filtered = self._filter(chunk, **filters)
+            if not filtered.empty:
+                yield filtered
+
+    def find(self, offset=0, limit=100, **filters):
+        """Página de resultados. `next_offset` es None cuando no quedan más.
+
+        `limit` se recorta a QUERY_MAX_LIMIT para no cargar el CSV entero.
+        """
+        offset, limit = max(int(offset), 0), min(max(int(limit), 0), QUERY_MAX_LIMIT)
+        wanted = offset + limit + 1
+        frames = []
+        seen = 0
+
+        for frame in self.iter_frames(**filters):
+            frames.append(frame)
+            seen += len(frame)
+            if seen >= wanted:
+                break
+
+        rows = pd.concat(frames) if frames else pd.DataFrame()
+        page = rows.iloc[offset:offset + limit]
+        items = json.loads(page.to_json(orient='records', force_ascii=False)) if len(page) else []
+        return {
+            'offset': offset,
+            'limit': limit,
+            'items': items,
+            'next_offset': offset + limit if seen > offset + limit else None,
+        }
+
+    def iter_ndjson(self, **filters):
+        for frame in self.iter_frames(**filters):
+            yield frame.to_json(orient='records', lines=True, force_ascii=False).rstrip('\n') + '\n'
+
+    def export_ndjson(self, out, **filters):
+        count = 0
+        for block in self.iter_ndjson(**filters):
+            out.write(block)
+            count += block.count('\n')
+        return count
+
+    def export_arrow(self, out, **filters):
+        """Escribe un stream Arrow IPC en `out` (requiere pyarrow)"""
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("La exportación Arrow requiere pyarrow (pip install pyarrow)")
+
+        writer = None
+        count = 0
+        try:
+            for frame in self.iter_frames(**filters):
+                if writer is None:
+                    schema = pa.schema([
+                        (c, pa.float64() if c in NUMERIC_COLUMNS else pa.string())
+                        for c in frame.columns
+                    ])
+                    writer = pa.ipc.new_stream(out, schema)
+                writer.write_batch(
+                    pa.RecordBatch.from_pandas(frame, schema=schema, preserve_index=False)
+                )
+                count += len(frame)
+        finally:
+            if writer is not None:
+                writer.close()
+        return count
+
+    def aggregates(self, marca=None, categoria=None):
+        """Resumen count/min/max/mean por marca y categoría.
+
+        Storage lo precalcula en cada guardado; si falta o es más antiguo
+        que products.csv, se calcula por bloques y se deja escrito.
+        """
+        if not os.path.exists(self.products_path):
+            summary = pd.DataFrame(columns=AGGREGATE_KEYS + ['count', 'min', 'max', 'mean'])
+        elif (os.path.exists(self.aggregates_path)
+              and os.path.getmtime(self.aggregates_path) >= os.path.getmtime(self.products_path)):
+            summary = pd.read_csv(self.aggregates_path, encoding='utf-8-sig')
+        else:
+            summary = self._compute_aggregates()
+            if not summary.empty:
+                summary.to_csv(self.aggregates_path, index=False, encoding='utf-8-sig')
+
+        for column, values in (('marca', marca), ('categoria', categoria)):
+            values = _as_list(values)
+            if values and not summary.empty:
+                summary = summary[summary[column].isin(values)]
+        return json.loads(summary.to_json(orient='records', force_ascii=False))
+
+    def _compute_aggregates(self):
+        partials = [
+            summarize(frame).assign(total=lambda s: s['count'] * s['mean'])
+            for frame in self.iter_frames()
+        ]
+        if not partials:
+            return pd.DataFrame(columns=AGGREGATE_KEYS + ['count', 'min', 'max', 'mean'])
+
+        combined = pd.concat(partials).groupby(AGGREGATE_KEYS).agg(
+            count=('count', 'sum'), min=('min', 'min'), max=('max', 'max'), total=('total', 'sum')
+        ).reset_index()
+        combined['mean'] = combined['total'] / combined['count']
+        return combined.drop(columns=['total'])
+
+
+def _params(query_string):
+    params = {k: v[-1] for k, v in parse_qs(query_string).items()}
+    filters = {k: params[k] for k in FILTER_COLUMNS if k in params}
+    for key in ('precio_min', 'precio_max'):
+        if key in params:
+            filters[key] = float(params[key])
+    return params, filters
+
+
+def serve(port=8080, host='127.0.0.1', data_dir='data'):
+    """API HTTP de sólo lectura sobre el almacén de productos.
+
+    GET /products?marca=&genero=&categoria=&precio_min=&precio_max=&offset=&limit=
+    GET /export.ndjson?<filtros>   GET /export.arrow?<filtros>
+    GET /aggregates?marca=&categoria=
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    query = ProductQuery(data_dir)
+
+    class QueryHandler(BaseHTTPRequestHandler):
+
+        def _send_json(self, payload, status=200):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            try:
+                params, filters = _params(url.query)
+                offset, limit = int(params.get('offset', 0)), int(params.get('limit', 100))
+            except ValueError as e:
+                self._send_json({'error': str(e)}, 400)
+                return
+
+            if url.path == '/products':
+                self._send_json(query.find(offset=offset, limit=limit, **filters))
+            elif url.path == '/aggregates':
+                self._send_json(query.aggregates(params.get('marca'), params.get('categoria')))
+            elif url.path == '/export.ndjson':
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson; charset=utf-8')
+                self.end_headers()
+                for block in query.iter_ndjson(**filters):
+                    self.wfile.write(block.encode('utf-8'))
+            elif url.path == '/export.arrow':
+                if importlib.util.find_spec('pyarrow') is None:
+                    self._send_json({'error': 'La exportación Arrow requiere pyarrow'}, 501)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/vnd.apache.arrow.stream')
+                self.end_headers()
+                query.export_arrow(self.wfile, **filters)
+            else:
+                self._send_json({'error': 'not found'}, 404)
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    logger.info(f"API de productos en http://{host}:{port}")
+    return server
@@ -2,9 +2,32 @@ import pandas as pd
 import os
 from datetime import datetime
 import logging
+from scraper.metrics import get_metrics
+from scraper.models import to_frame
 
 logger = logging.getLogger(__name__)
 
+AGGREGATE_KEYS = ['marca', 'categoria']
+
+
+def summarize(df):
+    """Resumen de precios por marca y categoría, el mismo que muestra el dashboard"""
+    df = df.assign(precio=pd.to_numeric(df['precio'], errors='coerce')).dropna(subset=['precio'])
+    return df.groupby(AGGREGATE_KEYS)['precio'].agg(['count', 'min', 'max', 'mean']).reset_index()
+
+
+def drop_duplicate_products(df, keep='first'):
+    """Quita repetidos por url. Las filas sin url no se comparan por url
+    (pandas trata todos los NaN como iguales), sino por marca, nombre y precio."""
+    if 'url' not in df.columns:
+        return df
+    has_url = df['url'].notna()
+    keys = [c for c in ('marca', 'nombre', 'precio') if c in df.columns]
+    return pd.concat([
+        df[has_url].drop_duplicates(subset=['url'], keep=keep),
+        df[~has_url].drop_duplicates(subset=keys, keep=keep),
+    ]).sort_index()
+
 
 class Storage:
     """Maneja el almacenamiento de productos en CSV"""
@@ -20,26 +43,30 @@ class Storage:
         os.makedirs(self.processed_dir, exist_ok=True)
 
     def save_raw(self, products, brand_name='unknown'):
-        if not products:
+        if len(products) == 0:
             logger.warning("No hay productos para guardar")
             return None
 
-        df = pd.DataFrame(products)
+        df = to_frame(products)
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"products_{brand_name}_{timestamp}.csv"
         filepath = os.path.join(self.raw_dir, filename)
 
-        df.to_csv(filepath, index=False, encoding='utf-8-sig')
+        with get_metrics().timer('scraper_storage_write_seconds', operation='raw'):
+            df.to_csv(filepath, index=False, encoding='utf-8-sig')
         logger.info(f"Datos crudos guardados: {filepath}")
         return filepath
 
     def save_processed(self, products):
-        if not products:
+        if len(products) == 0:
             logger.warning("No hay productos para guardar")
             return None
 
-        df = pd.DataFrame(products)
-        df = self._clean_data(df)
+        with get_metrics().timer('scraper_storage_write_seconds', operation='processed'):
+            return self._save_processed(products)
+
+    def _save_processed(self, products):
+        df = self._clean_data(to_frame(products))
 
         if df.empty:
             logger.warning("Todos los productos fueron filtrados")
@@ -52,12 +79,13 @@ class Storage:
                 if os.path.getsize(main_filepath) > 0:
                     df_existing = pd.read_csv(main_filepath)
                     df = pd.concat([df_existing, df], ignore_index=True)
-                    df = df.drop_duplicates(subset=['url'], keep='last')
+                    df = drop_duplicate_products(df, keep='last')
             except (pd.errors.EmptyDataError, Exception) as e:
                 logger.warning(f"CSV existente inválido, creando nuevo: {e}")
 
         df.to_csv(main_filepath, index=False, encoding='utf-8-sig')
         logger.info(f"Datos procesados guardados: {main_filepath} ({len(df)} productos)")
+        self.save_aggregates(df)
 
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         processed_filepath = os.path.join(
@@ -70,8 +98,7 @@ class Storage:
     def _clean_data(self, df):
         df = df.dropna(subset=['nombre', 'precio'])
 
-        if 'url' in df.columns:
-            df = df.drop_duplicates(subset=['url'], keep='first')
+        df = drop_duplicate_products(df)
 
         df['precio'] = pd.to_numeric(df['precio'], errors='coerce')
         df = df[df['precio'] > 0]
@@ -83,6 +110,30 @@ class Storage:
         existing_columns = [c for c in columns_order if c in df.columns]
         return df[existing_columns]
 
+    def save_aggregates(self, df):
+        filepath = os.path.join(self.data_dir, 'aggregates.csv')
+        summarize(df).to_csv(filepath, index=False, encoding='utf-8-sig')
+        return filepath
+
+    def attach_image_metadata(self, metadata):
+        """Añade a products.csv las columnas de dimensiones, hashes y miniatura por imagen"""
+        from scraper.images import IMAGE_COLUMNS
+
+        df = self.load_products()
+        if df.empty or not metadata:
+            return None
+
+        images = pd.DataFrame(metadata, columns=['imagen'] + IMAGE_COLUMNS)
+        images = images.drop_duplicates(subset=['imagen'], keep='last')
+        df = df.drop(columns=[c for c in IMAGE_COLUMNS if c in df.columns])
+        df = df.merge(images, on='imagen', how='left')
+
+        main_filepath = os.path.join(self.data_dir, 'products.csv')
+        with get_metrics().timer('scraper_storage_write_seconds', operation='images'):
+            df.to_csv(main_filepath, index=False, encoding='utf-8-sig')
+        logger.info(f"Metadatos de imagen añadidos: {images['imagen'].nunique()} imágenes")
+        return main_filepath
+
     def load_products(self):
         filepath = os.path.join(self.data_dir, 'products.csv')
         if os.path.exists(filepath) and os.path.getsize(filepath) > 0:
@@ -95,5 +146,6 @@ class Storage:
 
 def save_csv(products, brand_name='unknown'):
     storage = Storage()
-    storage.save_raw(products, brand_name)
-    return storage.save_processed(products)
+    df = to_frame(products)
+    storage.save_raw(df, brand_name)
+    return storage.save_processed(df)
@@ -0,0 +1,291 @@
+import json
+import re
+import logging
+from urllib.parse import urljoin, urlsplit
+from scraper.models import Product
+
+try:
+    from orjson import loads
+except ImportError:
+    from json import loads
+
+logger = logging.getLogger(__name__)
+
+JSON_LD_RE = re.compile(
+    r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>(.*?)</script>',
+    re.DOTALL | re.IGNORECASE
+)
+NEXT_DATA_RE = re.compile(
+    r'<script[^>]*id=["\']__NEXT_DATA__["\'][^>]*>(.*?)</script>',
+    re.DOTALL | re.IGNORECASE
+)
+STATE_RE = re.compile(
+    r'window\.__(?:INITIAL_STATE|PRELOADED_STATE|NUXT)__\s*=\s*',
+    re.IGNORECASE
+)
+SHOPIFY_META_RE = re.compile(r'var meta\s*=\s*')
+SHOPIFY_HTML_RE = re.compile(r'cdn\.shopify\.com|ShopifyAnalytics|Shopify\.shop\s*=')
+PRICE_RE = re.compile(r'\d+(?:[.,]\d{3})*(?:[.,]\d+)?')
+
+NAME_KEYS = ('name', 'title', 'productName', 'displayName')
+PRICE_KEYS = (
+    'price', 'salePrice', 'finalPrice', 'currentPrice', 'lowPrice',
+    'priceRange', 'prices', 'offers', 'minPrice', 'regularPrice'
+)
+AMOUNT_KEYS = (
+    'amount', 'value', 'current', 'final', 'sale', 'price',
+    'lowPrice', 'minVariantPrice', 'min', 'centAmount', 'regular'
+)
+URL_KEYS = ('url', 'href', 'link', 'permalink', 'path', '@id')
+SLUG_KEYS = ('slug', 'handle')
+IMAGE_KEYS = ('image', 'images', 'imageUrl', 'image_url', 'thumbnail', 'featured_image', 'media')
+
+
+def _decode_prefix(text):
+    """Decodifica el primer valor JSON de `text` ignorando lo que venga detrás"""
+    try:
+        return json.JSONDecoder().raw_decode(text)[0]
+    except ValueError:
+        return None
+
+
+def _coerce_price(value, cents=False):
+    """Precio como float. Con `cents` los enteros vienen en céntimos (API Ajax de Shopify)."""
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        if value <= 0:
+            return None
+        return value / 100 if cents and isinstance(value, int) else float(value)
+    if isinstance(value, str):
+        match = PRICE_RE.search(value)
+        if not match:
+            return None
+        number = match.group(0)
+        if ',' in number and '.' in number:
+            # El último separador es el decimal: 1.299,95 o 1,299.95
+            decimal = ',' if number.rfind(',') > number.rfind('.') else '.'
+            thousands = '.' if decimal == ',' else ','
+            number = number.replace(thousands, '').replace(decimal, '.')
+        else:
+            separator = ',' if ',' in number else '.'
+            groups = number.split(separator)
+            # 1.299 o 1,299 son miles, igual que 1.299.000; 12,5, 12.95 y 0,500 son decimales
+            if len(groups) > 2 or (len(groups) == 2 and len(groups[1]) == 3 and int(groups[0]) > 0):
+                number = ''.join(groups)
+            else:
+                number = number.replace(',', '.')
+        try:
+            price = float(number)
+        except ValueError:
+            return None
+        return price if price > 0 else None
+    if isinstance(value, dict):
+        if 'centAmount' in value and isinstance(value['centAmount'], (int, float)):
+            return value['centAmount'] / 10 ** value.get('fractionDigits', 2)
+        for key in AMOUNT_KEYS:
+            if key in value:
+                price = _coerce_price(value[key], cents)
+                if price:
+                    return price
+        return None
+    if isinstance(value, list):
+        prices = [p for p in (_coerce_price(v, cents) for v in value) if p]
+        return min(prices) if prices else None
+    return None
+
+
+def _first_string(value, keys=('url', 'src', 'contentUrl')):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        for item in value:
+            found = _first_string(item, keys)
+            if found:
+                return found
+    if isinstance(value, dict):
+        for key in keys:
+            found = _first_string(value.get(key), keys)
+            if found:
+                return found
+    return None
+
+
+def _find_slug_href(html, slug):
+    match = re.search(r'href=["\']([^"\']*/' + re.escape(slug) + r')(?:["\'?#])', html)
+    return match.group(1) if match else None
+
+
+def is_shopify_html(html):
+    return bool(html) and SHOPIFY_HTML_RE.search(html) is not None
+
+
+def is_shopify_endpoint(url):
+    return urlsplit(url).path.endswith(('/products.json', '/products.js'))
+
+
+def is_shopify_ajax(url):
+    """API Ajax de Shopify (*.js, cart.js, recomendaciones): precios enteros en céntimos"""
+    path = urlsplit(url).path
+    return path.endswith('.js') or '/recommendations/products' in path
+
+
+def product_from_dict(item, base_url, html=None, shopify=False, cents=False):
+    """Mapea un objeto JSON con pinta de producto al esquema del CSV, o None.
+
+    Un slug sin enlace en el HTML sólo se convierte en URL (/products/<slug>)
+    si la fuente es Shopify; en otras tiendas la URL queda vacía.
+    """
+    if not isinstance(item, dict):
+        return None
+
+    name = next((item[k] for k in NAME_KEYS if isinstance(item.get(k), str)), None)
+    if not name or len(name.strip()) <= 3:
+        return None
+
+    price = None
+    for key in PRICE_KEYS:
+        if key in item:
+            price = _coerce_price(item[key], cents)
+            if price:
+                break
+    if not price and isinstance(item.get('variants'), list):
+        price = _coerce_price(
+            [v.get('price') for v in item['variants'] if isinstance(v, dict)], cents
+        )
+    if not price:
+        return None
+
+    product = Product(nombre=name.strip(), precio=price)
+
+    url = next((item[k] for k in URL_KEYS if isinstance(item.get(k), str) and item[k]), None)
+    if not url:
+        slug = next((item[k] for k in SLUG_KEYS if isinstance(item.get(k), str) and item[k]), None)
+        if slug:
+            url = (html and _find_slug_href(html, slug)) or (shopify and f'/products/{slug}')
+    if url:
+        product.url = urljoin(base_url, url)
+
+    for key in IMAGE_KEYS:
+        image = _first_string(item.get(key))
+        if image:
+            product.imagen = urljoin(base_url, image)
+            break
+
+    return product
+
+
+def find_products_in_json(data, base_url, html=None, shopify=False, cents=False):
+    """Recorre un documento JSON y devuelve los productos de las listas que los contienen"""
+    products = []
+    seen = set()
+    stack = [data]
+
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list) and node:
+            mapped = [product_from_dict(item, base_url, html, shopify, cents) for item in node]
+            found = [p for p in mapped if p]
+            if len(found) >= 2 and len(found) * 2 >= len(node):
+                for product in found:
+                    key = product.url or product.nombre
+                    if key not in seen:
+                        seen.add(key)
+                        products.append(product)
+            else:
+                stack.extend(reversed(node))
+
+    return products
+
+
+def _json_ld_products(html, base_url):
+    products = []
+    for block in JSON_LD_RE.findall(html):
+        try:
+            data = loads(block.strip())
+        except ValueError as e:
+            logger.debug(f"JSON-LD inválido: {e}")
+            continue
+
+        nodes = data if isinstance(data, list) else [data]
+        stack = list(nodes)
+        while stack:
+            node = stack.pop(0)
+            if isinstance(node, list):
+                stack.extend(node)
+                continue
+            if not isinstance(node, dict):
+                continue
+
+            kind = node.get('@type')
+            kinds = kind if isinstance(kind, list) else [kind]
+            if 'Product' in kinds:
+                product = product_from_dict(node, base_url)
+                if product:
+                    products.append(product)
+            elif 'ItemList' in kinds:
+                stack.extend(node.get('itemListElement') or [])
+            elif 'ListItem' in kinds and isinstance(node.get('item'), dict):
+                stack.append(node['item'])
+            if '@graph' in node:
+                stack.extend(node['@graph'])
+
+    return products
+
+
+def _embedded_state_products(html, base_url):
+    blobs = []
+    match = NEXT_DATA_RE.search(html)
+    if match:
+        try:
+            blobs.append(loads(match.group(1).strip()))
+        except ValueError:
+            pass
+
+    for match in STATE_RE.finditer(html):
+        data = _decode_prefix(html[match.end():])
+        if data is not None:
+            blobs.append(data)
+
+    shopify = is_shopify_html(html)
+    products = []
+    for data in blobs:
+        products.extend(find_products_in_json(data, base_url, html, shopify))
+    return products
+
+
+def extract_products(html, base_url):
+    """Productos de JSON-LD o del estado embebido (__NEXT_DATA__, __INITIAL_STATE__...)"""
+    products = _json_ld_products(html, base_url)
+    if len(products) < 2:
+        products = _embedded_state_products(html, base_url)
+    return products
+
+
+def extract_shopify_prices(html):
+    """Precios exactos por nombre a partir de ShopifyAnalytics.meta"""
+    match = SHOPIFY_META_RE.search(html)
+    if not match:
+        return {}
+
+    meta = _decode_prefix(html[match.end():])
+    if not isinstance(meta, dict):
+        return {}
+
+    prices = {}
+    for product in meta.get('products') or []:
+        for variant in product.get('variants') or []:
+            name = variant.get('name') or ''
+            public_title = variant.get('public_title')
+            if public_title and name.endswith(f' - {public_title}'):
+                name = name[:-len(public_title) - 3]
+            price = variant.get('price')
+            if not name or not isinstance(price, (int, float)):
+                continue
+            key = name.strip().lower()
+            price = price / 100
+            if key not in prices or price < prices[key]:
+                prices[key] = price
+    return prices
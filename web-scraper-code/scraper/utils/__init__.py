@@ -1,4 +1,21 @@
-from .headers import get_random_user_agent, get_headers
-from .retry import retry_on_failure, random_delay
+import importlib
 
-__all__ = ['get_random_user_agent', 'get_headers', 'retry_on_failure', 'random_delay']
\ No newline at end of file
+# Carga perezosa: importar scraper.utils.retry no debe arrastrar requests
+_EXPORTS = {
+    'get_random_user_agent': 'headers',
+    'get_headers': 'headers',
+    'retry_on_failure': 'retry',
+    'random_delay': 'retry',
+    'new_session': 'session',
+    'get_session': 'session',
+    'close_session': 'session',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        module = importlib.import_module(f'.{_EXPORTS[name]}', __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
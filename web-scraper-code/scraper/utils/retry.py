@@ -1,7 +1,15 @@
 import time
 import random
 from functools import wraps
+from urllib.parse import urlparse
 from scraper.config import MAX_RETRIES, MIN_DELAY, MAX_DELAY
+from scraper.metrics import get_metrics
+
+def _domain_from_args(args):
+    for arg in args:
+        if isinstance(arg, str) and arg.startswith('http'):
+            return urlparse(arg).netloc
+    return ''
 
 def retry_on_failure(max_attempts=MAX_RETRIES):
     def decorator(func):
@@ -14,6 +22,11 @@ def retry_on_failure(max_attempts=MAX_RETRIES):
                     if attempt == max_attempts - 1:
                         print(f"  Error después de {max_attempts} intentos: {e}")
                         raise
+                    get_metrics().inc(
+                        'scraper_retries_total',
+                        function=func.__name__,
+                        domain=_domain_from_args(args)
+                    )
                     wait_time = random.uniform(MIN_DELAY, MAX_DELAY)
                     print(f"  Intento {attempt + 1} falló. Reintentando en {wait_time:.1f}s...")
                     time.sleep(wait_time)
@@ -0,0 +1,33 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from scraper.config import HTTP_POOL_SIZE
+from scraper.utils.headers import get_headers
+
+_local = threading.local()
+
+
+def new_session():
+    """Sesión HTTP con pool de conexiones para las APIs de las tiendas"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(get_headers())
+    session.headers['Accept'] = 'application/json, text/plain, */*'
+    return session
+
+
+def get_session():
+    """Sesión del hilo actual: cada navegador copia sus cookies en un jar propio"""
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = _local.session = new_session()
+    return session
+
+
+def close_session():
+    session = getattr(_local, 'session', None)
+    if session:
+        session.close()
+        _local.session = None
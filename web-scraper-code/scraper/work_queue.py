@@ -0,0 +1,380 @@
+from abc import ABC, abstractmethod
+import json
+import os
+import sqlite3
+import time
+import uuid
+import logging
+from scraper.config import QUEUE_BACKEND, QUEUE_URL, LEASE_TIMEOUT, MAX_RETRIES
+from scraper.models import Product
+
+logger = logging.getLogger(__name__)
+
+
+def _encode_products(products):
+    # Filas posicionales en el orden de PRODUCT_FIELDS: sin repetir las claves en cada producto
+    return json.dumps([product.to_tuple() for product in products])
+
+
+def _decode_products(payload):
+    return [Product(*row) for row in json.loads(payload)]
+
+
+class WorkQueue(ABC):
+    """Interfaz común de las colas de trabajo compartidas"""
+
+    @abstractmethod
+    def put(self, task):
+        """Encola una tarea ({'url', 'genero', 'categoria'}). Ignora URLs repetidas."""
+
+    @abstractmethod
+    def lease(self, visibility_timeout=LEASE_TIMEOUT):
+        """Reserva la siguiente tarea; vuelve a ser visible si no se confirma a tiempo."""
+
+    @abstractmethod
+    def touch(self, task_id, visibility_timeout=LEASE_TIMEOUT):
+        """Amplía la reserva de una tarea en curso. False si ya no es de este worker."""
+
+    @abstractmethod
+    def ack(self, task_id):
+        pass
+
+    @abstractmethod
+    def nack(self, task_id):
+        pass
+
+    @abstractmethod
+    def push_results(self, products):
+        pass
+
+    @abstractmethod
+    def pop_results(self, max_batches=10):
+        pass
+
+    @abstractmethod
+    def pending(self):
+        """Número de tareas sin terminar (pendientes o reservadas)"""
+
+    def put_many(self, tasks):
+        added = 0
+        for task in tasks:
+            if self.put(task):
+                added += 1
+        return added
+
+    def close(self):
+        pass
+
+
+class SQLiteQueue(WorkQueue):
+    """Cola sobre un fichero SQLite, compartible entre procesos de la misma máquina"""
+
+    def __init__(self, path=QUEUE_URL):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id TEXT PRIMARY KEY,
+                url TEXT UNIQUE NOT NULL,
+                payload TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                lease_until REAL NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_tasks_state ON tasks (state, lease_until);
+            CREATE TABLE IF NOT EXISTS results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                payload TEXT NOT NULL
+            );
+        """)
+
+    def put(self, task):
+        # Una URL ya terminada (o descartada) vuelve a encolarse en la siguiente pasada
+        cursor = self.conn.execute(
+            "INSERT INTO tasks (id, url, payload) VALUES (?, ?, ?) "
+            "ON CONFLICT (url) DO UPDATE SET "
+            "id = excluded.id, payload = excluded.payload, state = 'pending', "
+            "lease_until = 0, attempts = 0 "
+            "WHERE state IN ('done', 'failed')",
+            (uuid.uuid4().hex, task['url'], json.dumps(task))
+        )
+        return cursor.rowcount == 1
+
+    def lease(self, visibility_timeout=LEASE_TIMEOUT):
+        now = time.time()
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Una tarea que agota su reserva MAX_RETRIES veces (cuelga o tumba al worker) se descarta
+            discarded = self.conn.execute(
+                "UPDATE tasks SET state = 'failed' "
+                "WHERE state = 'leased' AND lease_until < ? AND attempts >= ?",
+                (now, MAX_RETRIES)
+            ).rowcount
+            if discarded:
+                logger.warning(f"{discarded} tareas descartadas tras {MAX_RETRIES} reservas caducadas")
+            row = self.conn.execute(
+                "SELECT id, payload FROM tasks "
+                "WHERE state = 'pending' OR (state = 'leased' AND lease_until < ?) "
+                "ORDER BY rowid LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                self.conn.execute('COMMIT')
+                return None
+            self.conn.execute(
+                "UPDATE tasks SET state = 'leased', lease_until = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                (now + visibility_timeout, row[0])
+            )
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+
+        task = json.loads(row[1])
+        task['id'] = row[0]
+        return task
+
+    def touch(self, task_id, visibility_timeout=LEASE_TIMEOUT):
+        cursor = self.conn.execute(
+            "UPDATE tasks SET lease_until = ? WHERE id = ? AND state = 'leased'",
+            (time.time() + visibility_timeout, task_id)
+        )
+        return cursor.rowcount == 1
+
+    def ack(self, task_id):
+        self.conn.execute("UPDATE tasks SET state = 'done' WHERE id = ?", (task_id,))
+
+    def nack(self, task_id):
+        row = self.conn.execute(
+            "SELECT attempts FROM tasks WHERE id = ? AND state = 'leased'", (task_id,)
+        ).fetchone()
+        if row is None:
+            return
+        state = 'failed' if row[0] >= MAX_RETRIES else 'pending'
+        self.conn.execute(
+            'UPDATE tasks SET state = ?, lease_until = 0 WHERE id = ?',
+            (state, task_id)
+        )
+        if state == 'failed':
+            logger.warning(f"Tarea descartada tras {row[0]} intentos: {task_id}")
+
+    def push_results(self, products):
+        if products:
+            self.conn.execute(
+                'INSERT INTO results (payload) VALUES (?)', (_encode_products(products),)
+            )
+
+    def pop_results(self, max_batches=10):
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = self.conn.execute(
+                'SELECT id, payload FROM results ORDER BY id LIMIT ?', (max_batches,)
+            ).fetchall()
+            if rows:
+                self.conn.execute('DELETE FROM results WHERE id <= ?', (rows[-1][0],))
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+
+        products = []
+        for _, payload in rows:
+            products.extend(_decode_products(payload))
+        return products
+
+    def pending(self):
+        # Las reservas caducadas sin reintentos restantes ya no cuentan: nadie las va a terminar
+        row = self.conn.execute(
+            "SELECT COUNT(*) FROM tasks WHERE state = 'pending' "
+            "OR (state = 'leased' AND (lease_until >= ? OR attempts < ?))",
+            (time.time(), MAX_RETRIES)
+        ).fetchone()
+        return row[0]
+
+    def close(self):
+        self.conn.close()
+
+
+# Cada operación sobre la cola es un script Lua: Redis lo ejecuta de forma
+# atómica, así que una tarea siempre está en `pending` o en `leased` y un
+# worker que muere a mitad de una reserva no la pierde.
+
+_REDIS_PUT = """
+if redis.call('HSETNX', KEYS[1], ARGV[1], ARGV[2]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[2], ARGV[2], ARGV[3])
+redis.call('HSET', KEYS[3], ARGV[2], ARGV[1])
+redis.call('RPUSH', KEYS[4], ARGV[2])
+return 1
+"""
+
+# KEYS: active, tasks, urls, attempts, pending, leased
+_REDIS_DISCARD = """
+local function discard(id)
+    local url = redis.call('HGET', KEYS[3], id)
+    if url and redis.call('HGET', KEYS[1], url) == id then
+        redis.call('HDEL', KEYS[1], url)
+    end
+    redis.call('HDEL', KEYS[2], id)
+    redis.call('HDEL', KEYS[3], id)
+    redis.call('HDEL', KEYS[4], id)
+end
+"""
+
+_REDIS_LEASE = _REDIS_DISCARD + """
+local now, deadline, max_retries = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local discarded = 0
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', KEYS[6], '-inf', now)) do
+    redis.call('ZREM', KEYS[6], id)
+    if tonumber(redis.call('HGET', KEYS[4], id) or '0') >= max_retries then
+        discard(id)
+        discarded = discarded + 1
+    else
+        redis.call('RPUSH', KEYS[5], id)
+    end
+end
+while true do
+    local id = redis.call('LPOP', KEYS[5])
+    if not id then
+        return {false, false, discarded}
+    end
+    local payload = redis.call('HGET', KEYS[2], id)
+    if payload then
+        redis.call('HINCRBY', KEYS[4], id, 1)
+        redis.call('ZADD', KEYS[6], deadline, id)
+        return {id, payload, discarded}
+    end
+end
+"""
+
+_REDIS_TOUCH = """
+if not redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], 'XX', ARGV[2], ARGV[1])
+return 1
+"""
+
+_REDIS_ACK = _REDIS_DISCARD + """
+redis.call('ZREM', KEYS[6], ARGV[1])
+redis.call('LREM', KEYS[5], 0, ARGV[1])
+discard(ARGV[1])
+return 1
+"""
+
+# Sólo quien sigue teniendo la reserva la devuelve: si ya caducó y se reencoló, no se duplica
+_REDIS_NACK = _REDIS_DISCARD + """
+if redis.call('ZREM', KEYS[6], ARGV[1]) == 0 then
+    return 0
+end
+if tonumber(redis.call('HGET', KEYS[4], ARGV[1]) or '0') >= tonumber(ARGV[2]) then
+    discard(ARGV[1])
+    return 2
+end
+redis.call('RPUSH', KEYS[5], ARGV[1])
+return 1
+"""
+
+
+_REDIS_PENDING = """
+local dead = 0
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])) do
+    if tonumber(redis.call('HGET', KEYS[3], id) or '0') >= tonumber(ARGV[2]) then
+        dead = dead + 1
+    end
+end
+return redis.call('HLEN', KEYS[1]) - dead
+"""
+
+
+class RedisQueue(WorkQueue):
+    """Cola sobre Redis (o cualquier servidor compatible) para repartir trabajo entre máquinas"""
+
+    def __init__(self, url=QUEUE_URL, client=None, prefix='scraper'):
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise ImportError("El backend 'redis' requiere el paquete redis (pip install redis)")
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+        self._put = client.register_script(_REDIS_PUT)
+        self._lease = client.register_script(_REDIS_LEASE)
+        self._touch = client.register_script(_REDIS_TOUCH)
+        self._ack = client.register_script(_REDIS_ACK)
+        self._nack = client.register_script(_REDIS_NACK)
+        self._pending = client.register_script(_REDIS_PENDING)
+
+    def _key(self, name):
+        return f"{self.prefix}:{name}"
+
+    def _keys(self):
+        return [self._key(name) for name in
+                ('active', 'tasks', 'urls', 'attempts', 'pending', 'leased')]
+
+    def put(self, task):
+        keys = [self._key(name) for name in ('active', 'tasks', 'urls', 'pending')]
+        return bool(self._put(keys=keys, args=[task['url'], uuid.uuid4().hex, json.dumps(task)]))
+
+    def lease(self, visibility_timeout=LEASE_TIMEOUT):
+        now = time.time()
+        task_id, payload, discarded = self._lease(
+            keys=self._keys(), args=[now, now + visibility_timeout, MAX_RETRIES]
+        )
+        if discarded:
+            logger.warning(f"{discarded} tareas descartadas tras {MAX_RETRIES} reservas caducadas")
+        if not task_id:
+            return None
+
+        task = json.loads(payload)
+        task['id'] = task_id.decode() if isinstance(task_id, bytes) else task_id
+        return task
+
+    def touch(self, task_id, visibility_timeout=LEASE_TIMEOUT):
+        deadline = time.time() + visibility_timeout
+        return bool(self._touch(keys=[self._key('leased')], args=[task_id, deadline]))
+
+    def ack(self, task_id):
+        self._ack(keys=self._keys(), args=[task_id])
+
+    def nack(self, task_id):
+        if self._nack(keys=self._keys(), args=[task_id, MAX_RETRIES]) == 2:
+            logger.warning(f"Tarea descartada tras {MAX_RETRIES} intentos: {task_id}")
+
+    def push_results(self, products):
+        if products:
+            self.client.rpush(self._key('results'), _encode_products(products))
+
+    def pop_results(self, max_batches=10):
+        products = []
+        for _ in range(max_batches):
+            payload = self.client.lpop(self._key('results'))
+            if payload is None:
+                break
+            products.extend(_decode_products(payload))
+        return products
+
+    def pending(self):
+        keys = [self._key(name) for name in ('tasks', 'leased', 'attempts')]
+        return self._pending(keys=keys, args=[time.time(), MAX_RETRIES])
+
+    def close(self):
+        try:
+            self.client.close()
+        except:
+            pass
+
+
+def get_queue(backend=QUEUE_BACKEND, url=QUEUE_URL):
+    if backend == 'sqlite':
+        return SQLiteQueue(url)
+    if backend == 'redis':
+        return RedisQueue(url)
+    raise ValueError(f"Backend de cola desconocido: {backend}")
@@ -0,0 +1,107 @@
+import pytest
+from scraper import api_harvest
+from scraper.api_harvest import _merge, infer_pattern, scrape_products
+from scraper.models import Product
+from scraper.profiles import ProfileStore
+from scraper.structured import find_products_in_json
+
+URL = 'https://tienda.es/c/camisas'
+
+
+def product(name, url=None, price=19.95):
+    return Product(nombre=name, precio=price, url=url)
+
+
+class FakeParser:
+    def __init__(self, products):
+        self.products = products
+
+    def brand(self):
+        return 'Tienda'
+
+    def parse_products(self, html):
+        return list(self.products)
+
+
+class FakeFetcher:
+    def __init__(self, captured):
+        self.captured = captured
+
+    def get_page(self, url):
+        return '<html></html>'
+
+    def cookies(self):
+        return []
+
+
+class NotFoundSession:
+    class Response:
+        status_code = 404
+
+    def get(self, url, **kwargs):
+        return self.Response()
+
+
+@pytest.fixture(autouse=True)
+def memory_patterns(monkeypatch):
+    monkeypatch.setattr(api_harvest, '_patterns', ProfileStore(None))
+
+
+def dom_products():
+    return [product(f'Camisa {c}', f'https://tienda.es/p/camisa-{c}') for c in ('azul', 'roja', 'negra')]
+
+
+def test_merge_matches_url_less_duplicates_by_name():
+    captured = [product(f'  camisa {c} ') for c in ('azul', 'roja', 'negra')]
+    assert len(_merge(dom_products(), captured)) == 3
+
+
+def test_merge_keeps_different_urls_with_same_name():
+    variants = [product('Camisa', 'https://tienda.es/p/1'), product('Camisa', 'https://tienda.es/p/2')]
+    assert len(_merge(variants)) == 2
+
+
+def test_merges_only_captures_that_overlap_the_listing():
+    listing = {
+        'url': 'https://tienda.es/graphql', 'method': 'POST',
+        'products': [product('Camisa negra')] + [product(f'Camisa extra {i}') for i in range(5)],
+    }
+    recommendations = {
+        'url': 'https://tienda.es/api/recommendations', 'method': 'POST',
+        'products': [product(f'Zapato {i}') for i in range(4)],
+    }
+    products = scrape_products(
+        URL, FakeParser(dom_products()), FakeFetcher([listing, recommendations]), NotFoundSession()
+    )
+    names = [p.nombre for p in products]
+    assert len(products) == 8
+    assert not any(name.startswith('Zapato') for name in names)
+    assert {p.marca for p in products if 'extra' in p.nombre} == {'Tienda'}
+
+
+def test_merges_capture_from_inferred_endpoint():
+    page_two = {
+        'url': 'https://tienda.es/api/products?page=2', 'method': 'GET',
+        'products': [product(f'Camisa extra {i}') for i in range(4)],
+    }
+    assert infer_pattern([page_two])['endpoint'] == 'https://tienda.es/api/products'
+    products = scrape_products(URL, FakeParser(dom_products()), FakeFetcher([page_two]), NotFoundSession())
+    assert len(products) == 7
+
+
+def test_js_only_grid_uses_largest_capture():
+    small = {'url': 'https://tienda.es/api/cart', 'method': 'POST', 'products': [product('Gorra'), product('Bolso')]}
+    grid = {'url': 'https://tienda.es/graphql', 'method': 'POST',
+            'products': [product(f'Camisa {i}') for i in range(10)]}
+    products = scrape_products(URL, FakeParser([]), FakeFetcher([small, grid]), NotFoundSession())
+    assert len(products) == 10
+
+
+def test_shopify_ajax_prices_are_cents():
+    payload = [{'title': 'Camisa azul', 'price': 4995, 'handle': 'camisa-azul'},
+               {'title': 'Camisa roja', 'price': 3995, 'handle': 'camisa-roja'}]
+    products = find_products_in_json(payload, URL, cents=True)
+    assert [p.precio for p in products] == [49.95, 39.95]
+
+    products = find_products_in_json(payload, URL)
+    assert [p.precio for p in products] == [4995.0, 3995.0]
@@ -0,0 +1,94 @@
+import os
+import re
+import pytest
+from scraper.parser import UniversalParser
+from scraper.profiles import ProfileStore
+
+URL = 'https://magento-demo.com/mujer/vestidos'
+DOMAIN = 'magento-demo.com'
+CORPUS = os.path.join(os.path.dirname(__file__), '..', 'benchmarks', 'corpus')
+
+
+@pytest.fixture(scope='module')
+def html():
+    with open(os.path.join(CORPUS, 'magento_category.html'), encoding='utf-8') as f:
+        return f.read()
+
+
+@pytest.fixture
+def store():
+    return ProfileStore(None)
+
+
+@pytest.fixture
+def generic_calls(monkeypatch):
+    calls = []
+    parse_generic = UniversalParser._parse_generic
+
+    def counting(self):
+        calls.append(self.domain)
+        return parse_generic(self)
+
+    monkeypatch.setattr(UniversalParser, '_parse_generic', counting)
+    return calls
+
+
+def parse(store, html):
+    return UniversalParser(URL, profile_store=store).parse_products(html)
+
+
+def without_prices(html, count):
+    # Tarjetas sin bloque de precio: ni el perfil ni la cascada genérica las dan por válidas
+    return re.sub(r'<div class="price-box.*?</div>', '', html, count=count, flags=re.S)
+
+
+def test_learns_profile_from_generic_pass(store, html, generic_calls):
+    products = parse(store, html)
+
+    profile = store.get(DOMAIN)
+    assert len(products) == 36
+    assert generic_calls == [DOMAIN]
+    assert profile['product_card'] == 'li.product'
+    assert profile['product_price'] == '.price'
+    assert (profile['cards'], profile['products'], profile['success_rate']) == (36, 36, 1.0)
+
+
+def test_reuses_profile_without_generic_pass(store, html, generic_calls):
+    parse(store, html)
+    learned = store.get(DOMAIN)
+
+    assert len(parse(store, html)) == 36
+    assert generic_calls == [DOMAIN]
+    assert store.get(DOMAIN) is learned
+
+
+def test_small_page_keeps_profile(store, html, generic_calls):
+    parse(store, html)
+    learned = store.get(DOMAIN)
+    cards = re.findall(r'<li class="item product product-item">.*?</li>', html, flags=re.S)
+    small = '<ol class="products list">' + ''.join(cards[:4]) + '</ol>'
+
+    assert len(parse(store, small)) == 4
+    assert generic_calls == [DOMAIN]
+    assert store.get(DOMAIN) is learned
+
+
+def test_relearns_when_profile_yield_drops(store, html, generic_calls):
+    store.save(DOMAIN, {'product_card': 'li.product', 'product_name': '.nombre-antiguo'}, 36, 36)
+
+    products = parse(store, html)
+
+    assert len(products) == 36
+    assert generic_calls == [DOMAIN]
+    assert store.get(DOMAIN)['product_name'] == '.name'
+
+
+def test_keeps_profile_when_generic_is_not_better(store, html, generic_calls):
+    parse(store, html)
+    learned = store.get(DOMAIN)
+
+    products = parse(store, without_prices(html, 30))
+
+    assert len(products) == 6
+    assert generic_calls == [DOMAIN, DOMAIN]
+    assert store.get(DOMAIN) is learned
@@ -0,0 +1,116 @@
+import io
+import os
+import time
+import pandas as pd
+import pytest
+from scraper import query as query_module
+from scraper.models import Product
+from scraper.query import ProductQuery
+from scraper.storage import Storage, summarize
+
+BRANDS = [('A', 'Mujer', 'Vestidos'), ('B', 'Hombre', 'Camisetas'), ('A', 'Hombre', 'Camisetas')]
+
+
+@pytest.fixture
+def products(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    items = [
+        Product(marca, genero, categoria, f'Producto {i}', 10 + i % 50, f'https://x/{i}', None)
+        for i, (marca, genero, categoria) in enumerate(BRANDS * 100)
+    ]
+    Storage().save_processed(items)
+    return items
+
+
+@pytest.fixture
+def query(products):
+    return ProductQuery('data', chunksize=7)
+
+
+def all_pages(query, limit, **filters):
+    items, offset = [], 0
+    while offset is not None:
+        page = query.find(offset=offset, limit=limit, **filters)
+        items.extend(page['items'])
+        offset = page['next_offset']
+    return items
+
+
+def test_pagination_covers_every_row_once(query):
+    items = all_pages(query, limit=13)
+    assert len(items) == 300
+    assert len({item['url'] for item in items}) == 300
+
+
+def test_last_page_has_no_next_offset(query):
+    page = query.find(offset=290, limit=50)
+    assert len(page['items']) == 10
+    assert page['next_offset'] is None
+
+    page = query.find(offset=280, limit=20)
+    assert len(page['items']) == 20
+    assert page['next_offset'] is None
+
+
+def test_filters(query):
+    assert len(all_pages(query, 50, marca='A')) == 200
+    assert len(all_pages(query, 50, marca='A,B', genero='Hombre')) == 200
+    assert len(all_pages(query, 50, marca=['B'], categoria='Camisetas')) == 100
+
+    items = all_pages(query, 50, precio_min=20, precio_max=29.5)
+    assert items and all(20 <= item['precio'] <= 29.5 for item in items)
+
+
+def test_limit_is_capped(query, monkeypatch):
+    monkeypatch.setattr(query_module, 'QUERY_MAX_LIMIT', 25)
+    page = query.find(limit=10 ** 9)
+    assert page['limit'] == 25
+    assert len(page['items']) == 25
+    assert page['next_offset'] == 25
+
+
+def test_chunked_aggregates_match_full_summary(query):
+    os.remove(query.aggregates_path)
+    chunked = pd.DataFrame(query.aggregates())
+    expected = summarize(pd.read_csv(query.products_path))
+
+    merged = chunked.merge(expected, on=['marca', 'categoria'], suffixes=('', '_full'))
+    assert len(merged) == len(expected) == 3
+    for column in ('count', 'min', 'max', 'mean'):
+        assert merged[column].tolist() == pytest.approx(merged[f'{column}_full'].tolist())
+
+
+def test_aggregates_follow_products_file(query):
+    assert {row['marca'] for row in query.aggregates()} == {'A', 'B'}
+
+    os.remove(query.products_path)
+    assert query.aggregates() == []
+
+    # products.csv más reciente que aggregates.csv: se recalcula
+    pd.DataFrame([{'marca': 'C', 'genero': 'Mujer', 'categoria': 'Faldas', 'nombre': 'Falda',
+                   'precio': 30.0, 'url': 'https://x/c', 'imagen': None}]).to_csv(
+        query.products_path, index=False)
+    future = time.time() + 10
+    os.utime(query.products_path, (future, future))
+    assert [row['marca'] for row in query.aggregates()] == ['C']
+
+
+def test_ndjson_export_streams_filtered_rows(query):
+    out = io.StringIO()
+    assert query.export_ndjson(out, marca='B') == 100
+    assert len(out.getvalue().splitlines()) == 100
+
+
+def test_arrow_schema_is_stable_when_first_chunk_has_empty_column(tmp_path):
+    pa = pytest.importorskip('pyarrow')
+    rows = [{'marca': 'A', 'nombre': f'P{i}', 'precio': 10 + i, 'url': f'https://x/{i}',
+             'imagen': None if i < 5 else f'https://img/{i}.jpg', 'imagen_ancho': None if i < 5 else 800}
+            for i in range(10)]
+    pd.DataFrame(rows).to_csv(tmp_path / 'products.csv', index=False)
+
+    out = io.BytesIO()
+    assert ProductQuery(str(tmp_path), chunksize=5).export_arrow(out) == 10
+    table = pa.ipc.open_stream(out.getvalue()).read_all()
+    assert table.num_rows == 10
+    assert table.schema.field('imagen').type == pa.string()
+    assert table.schema.field('imagen_ancho').type == pa.float64()
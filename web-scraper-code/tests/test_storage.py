@@ -0,0 +1,49 @@
+import json
+import pandas as pd
+import pytest
+from scraper.models import Product
+from scraper.parser import UniversalParser
+from scraper.profiles import ProfileStore
+from scraper.storage import Storage, save_csv
+
+
+@pytest.fixture(autouse=True)
+def in_tmp(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+def next_data_page(count):
+    items = [{'title': f'Camisa {i}', 'price': 19.95 + i, 'slug': f'camisa-{i}'} for i in range(count)]
+    data = {'props': {'pageProps': {'products': items}}}
+    return (
+        '<html><body><div id="grid"></div>'
+        f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(data)}</script>'
+        '</body></html>'
+    )
+
+
+def test_products_without_url_are_not_collapsed():
+    products = UniversalParser('https://shop.es/c/camisas', ProfileStore(None)).parse_products(
+        next_data_page(20)
+    )
+    assert len(products) == 20
+    assert all(product.url is None for product in products)
+
+    path = save_csv(products, 'shop')
+    assert len(pd.read_csv(path)) == 20
+
+    # Guardar otra vez lo mismo no duplica filas
+    save_csv(products, 'shop')
+    assert len(pd.read_csv(path)) == 20
+
+
+def test_products_with_url_dedupe_on_url():
+    products = [
+        Product('M', 'Mujer', 'Vestidos', 'Vestido', 10.0, 'https://x/1', None),
+        Product('M', 'Mujer', 'Vestidos', 'Vestido rebajado', 8.0, 'https://x/1', None),
+        Product('M', 'Mujer', 'Vestidos', 'Falda', 12.0, 'https://x/2', None),
+    ]
+    path = Storage().save_processed(products)
+    df = pd.read_csv(path)
+    assert sorted(df['url']) == ['https://x/1', 'https://x/2']
+    assert df.loc[df['url'] == 'https://x/1', 'nombre'].item() == 'Vestido'
@@ -0,0 +1,68 @@
+import pytest
+from scraper.structured import _coerce_price, product_from_dict, find_products_in_json
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('1.299 €', 1299.0),
+    ('1,299', 1299.0),
+    ('1.299.000', 1299000.0),
+    ('1.299,95 €', 1299.95),
+    ('1,299.95', 1299.95),
+    ('12,95', 12.95),
+    ('12.95', 12.95),
+    ('19,9', 19.9),
+    ('0,500', 0.5),
+    ('0.99', 0.99),
+    ('€ 49', 49.0),
+    (39.95, 39.95),
+    ({'amount': '24,50'}, 24.5),
+    ({'centAmount': 4995, 'fractionDigits': 2}, 49.95),
+    ([{'price': '30'}, {'price': '25'}], 25.0),
+    ('gratis', None),
+    (0, None),
+    (True, None),
+])
+def test_coerce_price(value, expected):
+    assert _coerce_price(value) == expected
+
+
+def test_explicit_url_is_joined_with_base():
+    product = product_from_dict(
+        {'name': 'Camisa azul', 'price': 20, 'url': '/p/camisa-azul'}, 'https://shop.es/c/camisas'
+    )
+    assert product.url == 'https://shop.es/p/camisa-azul'
+
+
+def test_slug_without_shopify_leaves_url_empty():
+    product = product_from_dict(
+        {'title': 'Camisa azul', 'price': 20, 'slug': 'camisa-azul'}, 'https://shop.es/c/camisas'
+    )
+    assert product.url is None
+
+
+def test_slug_on_shopify_uses_products_path():
+    product = product_from_dict(
+        {'title': 'Camisa azul', 'price': 20, 'handle': 'camisa-azul'},
+        'https://shop.es/collections/camisas', shopify=True
+    )
+    assert product.url == 'https://shop.es/products/camisa-azul'
+
+
+def test_slug_prefers_href_found_in_html():
+    html = '<a href="/es/tienda/camisa-azul">Camisa azul</a>'
+    product = product_from_dict(
+        {'title': 'Camisa azul', 'price': 20, 'slug': 'camisa-azul'}, 'https://shop.es/c/camisas', html
+    )
+    assert product.url == 'https://shop.es/es/tienda/camisa-azul'
+
+
+def test_items_without_name_or_price_are_ignored():
+    assert product_from_dict({'title': 'Camisa', 'price': 0}, 'https://shop.es/') is None
+    assert product_from_dict({'title': 'abc', 'price': 10}, 'https://shop.es/') is None
+    assert product_from_dict(['no', 'es', 'un', 'dict'], 'https://shop.es/') is None
+
+
+def test_find_products_in_json_keeps_url_less_items_apart():
+    data = {'items': [{'title': f'Camisa {i}', 'price': 10 + i, 'slug': f'c-{i}'} for i in range(3)]}
+    products = find_products_in_json(data, 'https://shop.es/c/camisas')
+    assert [p.nombre for p in products] == ['Camisa 0', 'Camisa 1', 'Camisa 2']
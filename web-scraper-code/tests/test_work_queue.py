@@ -0,0 +1,185 @@
+import pytest
+from scraper.config import MAX_RETRIES
+from scraper.distributed import run_coordinator
+from scraper.models import Product
+from scraper.work_queue import SQLiteQueue, RedisQueue
+
+EXPIRED = -1  # reserva que ya ha caducado al volver a pedir tarea
+
+
+@pytest.fixture(params=['sqlite', 'redis'])
+def queue(request, tmp_path):
+    if request.param == 'sqlite':
+        q = SQLiteQueue(str(tmp_path / 'queue.db'))
+    else:
+        fakeredis = pytest.importorskip('fakeredis')
+        pytest.importorskip('lupa')
+        q = RedisQueue(client=fakeredis.FakeRedis())
+    yield q
+    q.close()
+
+
+def task(n=1):
+    return {'url': f'https://tienda.test/c/{n}', 'genero': 'Mujer', 'categoria': 'Vestidos'}
+
+
+class FakeStorage:
+    def __init__(self):
+        self.saved = []
+
+    def save_raw(self, products, label):
+        pass
+
+    def save_processed(self, products):
+        self.saved.extend(products)
+
+
+def test_put_ignores_url_already_queued(queue):
+    assert queue.put(task())
+    assert not queue.put(task())
+    assert queue.pending() == 1
+
+
+def test_url_can_be_queued_again_after_done(queue):
+    queue.put(task())
+    leased = queue.lease()
+    queue.ack(leased['id'])
+    assert queue.pending() == 0
+
+    assert queue.put_many([task()]) == 1
+    assert queue.lease()['url'] == task()['url']
+
+
+def test_url_can_be_queued_again_after_discard(queue):
+    queue.put(task())
+    for _ in range(MAX_RETRIES):
+        queue.nack(queue.lease()['id'])
+    assert queue.pending() == 0
+    assert queue.put(task())
+
+
+def test_lease_hides_task_until_it_expires(queue):
+    queue.put(task())
+    queue.lease()
+    assert queue.lease() is None
+
+    queue.put(task(2))
+    assert queue.lease()['url'] == task(2)['url']
+
+
+def test_expired_lease_is_leased_again(queue):
+    queue.put(task())
+    first = queue.lease(EXPIRED)
+    second = queue.lease()
+    assert second['id'] == first['id']
+    assert queue.lease() is None
+
+
+def test_expired_lease_discarded_after_max_retries(queue):
+    queue.put(task())
+    for _ in range(MAX_RETRIES):
+        assert queue.lease(EXPIRED) is not None
+    assert queue.pending() == 0
+    assert queue.lease() is None
+
+
+def test_nack_requeues_until_max_retries(queue):
+    queue.put(task())
+    for _ in range(MAX_RETRIES - 1):
+        queue.nack(queue.lease()['id'])
+        assert queue.pending() == 1
+    queue.nack(queue.lease()['id'])
+    assert queue.pending() == 0
+    assert queue.lease() is None
+
+
+def test_late_nack_does_not_duplicate_task(queue):
+    queue.put(task())
+    stale = queue.lease(EXPIRED)
+    current = queue.lease()
+    queue.nack(stale['id'])
+    queue.ack(current['id'])
+    assert queue.lease() is None
+    assert queue.pending() == 0
+
+
+def test_results_round_trip(queue):
+    products = [Product('Marca', 'Mujer', 'Vestidos', 'Vestido largo', 39.95, 'https://x/1', None)]
+    queue.push_results(products)
+    assert [p.to_tuple() for p in queue.pop_results()] == [products[0].to_tuple()]
+    assert queue.pop_results() == []
+
+
+def test_coordinator_collects_results_and_stops(queue):
+    queue.put_many([task(1), task(2)])
+    while True:
+        leased = queue.lease()
+        if leased is None:
+            break
+        queue.push_results([Product(nombre=leased['url'], precio=10.0, url=leased['url'])])
+        queue.ack(leased['id'])
+
+    storage = FakeStorage()
+    assert run_coordinator(queue, storage, poll_interval=0) == 2
+    assert len(storage.saved) == 2
+
+
+def test_coordinator_stops_when_task_exhausts_retries(queue):
+    queue.put(task())
+    for _ in range(MAX_RETRIES):
+        queue.lease(EXPIRED)
+
+    assert run_coordinator(queue, FakeStorage(), poll_interval=0) == 0
+
+
+def test_coordinator_second_run_processes_same_manifest(queue):
+    for _ in range(2):
+        assert queue.put_many([task()]) == 1
+        leased = queue.lease()
+        queue.push_results([Product(nombre='Vestido', precio=10.0, url=leased['url'])])
+        queue.ack(leased['id'])
+        assert run_coordinator(queue, FakeStorage(), poll_interval=0) == 1
+
+
+def test_touch_extends_lease(queue):
+    queue.put(task())
+    leased = queue.lease(EXPIRED)
+    assert queue.touch(leased['id'], 300)
+    assert queue.lease() is None
+
+
+def test_touch_fails_once_lease_is_lost(queue):
+    queue.put(task())
+    stale = queue.lease(EXPIRED)
+    queue.ack(queue.lease()['id'])
+    assert not queue.touch(stale['id'], 300)
+
+
+def test_worker_extends_lease_while_processing(queue, monkeypatch):
+    import threading
+    from scraper import distributed
+
+    def slow_scrape(url, parser, fetcher, session=None, keepalive=None):
+        # La reserva inicial ya ha caducado: sin keepalive otro worker la cogería
+        keepalive()
+        assert queue.lease() is None
+        return [Product(nombre='Vestido', precio=10.0, url=url)]
+
+    monkeypatch.setattr(distributed, 'scrape_products', slow_scrape)
+    queue.put(task())
+    processed = distributed._worker_loop(
+        queue, fetcher=None, stop_event=threading.Event(), idle_timeout=0,
+        visibility_timeout=EXPIRED
+    )
+    assert processed == 1
+    assert queue.pending() == 0
+
+
+def test_incomplete_backend_fails_on_construction():
+    from scraper.work_queue import WorkQueue
+
+    class NoAck(WorkQueue):
+        put = lease = touch = nack = push_results = pop_results = pending = lambda self, *a: None
+
+    with pytest.raises(TypeError):
+        NoAck()